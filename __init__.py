@@ -23,25 +23,44 @@ bl_info = {
     "tracker_url" : ""
 }
 
-import bpy
+import sys
 
-from OrigamiFold import foldOps, foldMenus
-modules = [foldOps, foldMenus]
+try:
+    import bpy
+except ImportError:
+    # Loaded outside of Blender (e.g. by worker processes), only the pure modules are usable
+    bpy = None
+
+# Only the UI modules load at startup, the fold code is imported when an operator runs
+modules = []
+if bpy != None:
+    from OrigamiFold import foldPrefs, foldOps, foldMenus, foldImport, foldBake, foldCollide, foldValidate, foldInstance
+    modules = [foldPrefs, foldOps, foldMenus, foldImport, foldBake, foldCollide, foldValidate, foldInstance]
 
 def draw_menu(self, context):
     layout = self.layout
     layout.separator()
     layout.menu("VIEW3D_MT_edit_origami_fold_menu")
 
+def draw_import_menu(self, context):
+    self.layout.operator("import_mesh.origami_fold", text="FOLD Crease Pattern (.fold)")
+
 def register():
     for m in modules:
         m.register()
     bpy.types.VIEW3D_MT_edit_mesh_edges.append(draw_menu)
+    bpy.types.TOPBAR_MT_file_import.append(draw_import_menu)
 
 def unregister():
     for m in modules:
         m.unregister()
+
+    # The cache installs its handlers on first use
+    foldCache = sys.modules.get(__name__ + '.foldCache')
+    if foldCache != None:
+        foldCache.unregister()
     bpy.types.VIEW3D_MT_edit_mesh_edges.remove(draw_menu)
+    bpy.types.TOPBAR_MT_file_import.remove(draw_import_menu)
 
 # Call register when run as a script
 if __name__ == "__main__":
@@ -0,0 +1,188 @@
+# Headless batch rigger for directories of .blend files
+#
+# Rig several files at once using a pool of background Blender processes:
+#   python batchRig.py --blender /path/to/blender --spec creases.json --jobs 4 --output-dir rigged/ *.blend
+#
+# Rig the file Blender has open (this is what every pool process runs):
+#   blender -b paper.blend -P batchRig.py -- --spec creases.json --output-dir rigged/
+#
+# With the bpy module installed, files can also be rigged in-process:
+#   python -m OrigamiFold.batchRig --spec creases.json --in-place *.blend
+#
+# The crease spec is JSON listing the creases to rig per mesh object, either as
+# vertex index pairs or as every crease line marked with seams:
+#   {"objects": {"Paper": [{"vertices": [0, 12], "side": "DUAL"}, {"vertices": [3, 7]}],
+#                "Plane": {"seams": true, "side": "LEFT"}},
+#    "processes": 4}
+import argparse
+import importlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+resultTag = 'ORIGAMI_FOLD_RESULT '
+
+def loadAddonModule(name):
+    # Works when run as a script (-P) as well as with 'python -m'
+    addonDir = os.path.dirname(os.path.abspath(__file__))
+    if __package__:
+        return importlib.import_module(__package__ + '.' + name)
+    sys.path.insert(0, os.path.dirname(addonDir))
+    return importlib.import_module(os.path.basename(addonDir) + '.' + name)
+
+def parseArgs(argv):
+    parser = argparse.ArgumentParser(description="Rig origami folds in .blend files without the UI")
+    parser.add_argument('files', nargs='*', help=".blend files to rig (none: rig the file Blender has open)")
+    parser.add_argument('--spec', required=True, help="JSON crease spec")
+    parser.add_argument('--output-dir', help="save rigged files here (same file names)")
+    parser.add_argument('--in-place', action='store_true', help="overwrite the input files")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="Blender processes to run at once")
+    parser.add_argument('--blender', default=os.environ.get('BLENDER', shutil.which('blender')),
+        help="Blender binary for the process pool (default: $BLENDER or blender on PATH)")
+    parser.add_argument('--processes', type=int,
+        help="fold classification workers per Blender process (default: the CPUs shared out across --jobs)")
+    args = parser.parse_args(argv)
+    if not args.output_dir and not args.in_place:
+        parser.error("choose --output-dir or --in-place")
+    return args
+
+def seamCreases(obRoot, side):
+    import numpy as np
+    foldFormat = loadAddonModule('foldFormat')
+
+    # Treat seams as valley creases and group collinear ones into lines
+    mesh = obRoot.data
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', coords)
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', edges)
+    seams = np.empty(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get('use_seam', seams)
+
+    data = {
+        'vertices_coords': coords.reshape(-1, 3).astype(np.float64),
+        'edges_vertices': edges.reshape(-1, 2).astype(np.int64),
+        'edges_assignment': np.where(seams, foldFormat.VALLEY, foldFormat.ASSIGNMENT_CODES['U']).astype(np.int8),
+        'edges_foldAngle': np.full(len(mesh.edges), np.nan)
+    }
+    return [(v0, v1, side) for v0, v1, _, _, _ in foldFormat.creaseLines(data)]
+
+def rigOpenFile(spec, processes = None):
+    import bpy
+    foldUtils = loadAddonModule('foldUtils')
+
+    if bpy.context.mode != 'OBJECT':
+        bpy.ops.object.mode_set(mode='OBJECT')
+
+    foldCount = 0
+    for objectName, creaseSpec in spec['objects'].items():
+        obRoot = bpy.data.objects[objectName]
+        if isinstance(creaseSpec, dict) and creaseSpec.get('seams'):
+            creases = seamCreases(obRoot, creaseSpec.get('side', 'LEFT'))
+        else:
+            creases = [(c['vertices'][0], c['vertices'][1], c.get('side', 'LEFT')) for c in creaseSpec]
+        if len(creases) == 0:
+            continue
+
+        # Armature goes next to the paper, numbering continues after existing folds
+        armatureObj = foldUtils.getFoldArmature(obRoot, obRoot.name + ' Folds', foldUtils.paperCollection(obRoot))
+        foldUtils.parentToArmature(obRoot, armatureObj)
+        boneNames, _ = foldUtils.rigFolds(obRoot, creases, foldUtils.nextFoldNumber(armatureObj),
+            processes if processes != None else spec.get('processes'))
+        foldCount = foldCount + len(creases)
+
+    return foldCount
+
+def rigFile(spec, source, args):
+    import bpy
+
+    start = time.perf_counter()
+    if source != None:
+        bpy.ops.wm.open_mainfile(filepath=source)
+    source = bpy.data.filepath
+    foldCount = rigOpenFile(spec, args.processes)
+
+    target = source if args.in_place else os.path.join(args.output_dir, os.path.basename(source))
+    bpy.ops.wm.save_as_mainfile(filepath=target)
+    return {'file': source, 'output': target, 'folds': foldCount, 'seconds': time.perf_counter() - start}
+
+def runBlender(args, source):
+    # Rig one file in its own background Blender process
+    command = [args.blender, '-b', source, '--factory-startup', '-P', os.path.abspath(__file__), '--',
+        '--spec', args.spec]
+    command += ['--in-place'] if args.in_place else ['--output-dir', args.output_dir]
+    if args.processes != None:
+        command += ['--processes', str(args.processes)]
+
+    start = time.perf_counter()
+    process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    for line in process.stdout.splitlines():
+        if line.startswith(resultTag):
+            return json.loads(line[len(resultTag):])
+
+    tail = process.stdout.strip().splitlines()[-5:]
+    return {'file': source, 'error': '\n'.join(tail) or 'exit code %d' % process.returncode,
+        'folds': 0, 'seconds': time.perf_counter() - start}
+
+def printSummary(results, wallTime):
+    for result in results:
+        if 'error' in result:
+            print('FAILED  %s\n%s' % (result['file'], result['error']))
+        else:
+            print('%7.2fs  %4d folds  %s' % (result['seconds'], result['folds'], result['file']))
+
+    done = [result for result in results if 'error' not in result]
+    foldCount = sum(result['folds'] for result in done)
+    print('%d/%d files, %d folds in %.2fs wall time (%.2f files/s, %.1f folds/s)' % (
+        len(done), len(results), foldCount, wallTime,
+        len(done) / wallTime if wallTime > 0 else 0.0, foldCount / wallTime if wallTime > 0 else 0.0))
+    return len(done) == len(results)
+
+def main(argv):
+    args = parseArgs(argv)
+    with open(args.spec, 'r') as f:
+        spec = json.load(f)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    try:
+        import bpy
+    except ImportError:
+        bpy = None
+
+    start = time.perf_counter()
+
+    # Inside Blender (-P) with no file list: rig the open file and report to the pool
+    if bpy != None and len(args.files) == 0:
+        result = rigFile(spec, None, args)
+        print(resultTag + json.dumps(result))
+        return True
+
+    # Several files in parallel Blender processes
+    if args.blender != None and args.jobs > 1:
+        # Every Blender process starts its own worker pool, so they share the CPUs instead of each taking all
+        if args.processes == None:
+            args.processes = max(1, (spec.get('processes') or os.cpu_count() or 1) // args.jobs)
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(lambda source: runBlender(args, source), args.files))
+
+    # One at a time, in this process when bpy is available
+    elif bpy != None:
+        results = [rigFile(spec, source, args) for source in args.files]
+    elif args.blender != None:
+        results = [runBlender(args, source) for source in args.files]
+    else:
+        print("No Blender binary found, pass --blender or set $BLENDER")
+        return False
+
+    return printSummary(results, time.perf_counter() - start)
+
+if __name__ == '__main__':
+    # Blender passes its own arguments first, ours follow '--'
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+    if not main(argv):
+        sys.exit(1)
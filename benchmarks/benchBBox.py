@@ -0,0 +1,140 @@
+# Compare a NumPy computeBBox against the original bboxUtils per-vertex loop
+#   python benchmarks/benchBBox.py
+# Runs without Blender, mesh vertices are stood in for by simple objects
+import timeit
+from collections import namedtuple
+
+import numpy as np
+
+Co = namedtuple('Co', 'x y z')
+Vert = namedtuple('Vert', 'index co')
+eps = 1e-6
+
+def legacyComputeBBox(verts):
+    # bboxUtils.computeBBox from before vectorizing, copied verbatim for comparison
+    # Val will hold min/max coords, idx will hold index of verts with those cords
+    bboxVal = [float('inf'), -float('inf'), float('inf'), -float('inf')]
+    bboxIdx = [[], [], [], []]
+
+    # Loop over verts and search for the max/min coordinate values
+    for vert in verts:
+        # Check min-x
+        if vert.co.x <= bboxVal[0]:
+            if abs(vert.co.x - bboxVal[0]) < eps:
+                bboxIdx[0].append(vert.index)
+            else:
+                bboxVal[0] = vert.co.x
+                bboxIdx[0] = [vert.index]
+
+        # Check max-x
+        if vert.co.x >= bboxVal[1]:
+            if abs(vert.co.x - bboxVal[1]) < eps:
+                bboxIdx[1].append(vert.index)
+            else:
+                bboxVal[1] = vert.co.x
+                bboxIdx[1] = [vert.index]
+        
+        # Check min-y
+        if vert.co.y <= bboxVal[2]:
+            if abs(vert.co.y - bboxVal[2]) < eps:
+                bboxIdx[2].append(vert.index)
+            else:
+                bboxVal[2] = vert.co.y
+                bboxIdx[2] = [vert.index]
+
+        # Check max-y
+        if vert.co.y >= bboxVal[3]:
+            if abs(vert.co.y - bboxVal[3]) < eps:
+                bboxIdx[3].append(vert.index)
+            else:
+                bboxVal[3] = vert.co.y
+                bboxIdx[3] = [vert.index]
+    
+    # Debug: Print edge indexes
+    # print('BBox Edges:')
+    # print('\t  Left:', bboxIdx[0])
+    # print('\t Right:', bboxIdx[1])
+    # print('\tBottom:', bboxIdx[2])
+    # print('\t   Top:', bboxIdx[3])
+
+    # Check four corners (only two of these should pass)
+    corners = []
+    for idx in bboxIdx[0]:
+        # Top-left
+        if idx in bboxIdx[3]:
+            corners.insert(0, idx)
+    
+        # Bottom-left
+        if idx in bboxIdx[2]:
+            corners.append(idx)
+
+    for idx in bboxIdx[1]:
+        # Top-right
+        if idx in bboxIdx[3]:
+            corners.insert(0, idx)
+
+        # Bottom-right
+        if idx in bboxIdx[2]:
+            corners.append(idx)
+
+    # Return bbox coords and the corner
+    return [bboxVal, corners]
+
+def vectorizedComputeBBox(coords, indices = None):
+    # The NumPy version the add-on used until fold endpoints came from walking the edge chain
+    # Work on the requested subset (repeated verts do not change a bounding box)
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+    if indices is None:
+        indices = np.arange(len(coords))
+    else:
+        indices = np.asarray(indices, dtype=np.int64)
+    points = coords[indices]
+
+    # Search for the max/min coordinate values along all three axes
+    bboxMin = points.min(axis=0)
+    bboxMax = points.max(axis=0)
+    bboxVal = [bboxMin[0], bboxMax[0], bboxMin[1], bboxMax[1], bboxMin[2], bboxMax[2]]
+
+    # Flag verts lying on each side (within eps of the extreme value)
+    onMin = np.abs(points - bboxMin) < eps
+    onMax = np.abs(points - bboxMax) < eps
+
+    # Check four XY corners, top-left, top-right, bottom-left then bottom-right
+    # (only two of these should pass, or the same vert twice for axis aligned verts)
+    candidates = np.concatenate([
+        indices[onMin[:, 0] & onMax[:, 1]],
+        indices[onMax[:, 0] & onMax[:, 1]],
+        indices[onMin[:, 0] & onMin[:, 1]],
+        indices[onMax[:, 0] & onMin[:, 1]]
+    ])
+
+    # Keep each corner vert once, in order of first appearance
+    _, first = np.unique(candidates, return_index=True)
+    corners = candidates[np.sort(first)].tolist()
+
+    # Return bbox coords and the corner
+    return [bboxVal, corners]
+
+def makeFold(count, kind):
+    # A long fold made of many short edge segments (shared verts appear twice)
+    t = np.linspace(0.0, 1.0, count + 1)
+    if kind == 'diagonal':
+        coords = np.stack([t, t, np.zeros_like(t)], axis=1)
+    else:
+        coords = np.stack([np.full_like(t, 0.5), t, np.zeros_like(t)], axis=1)
+    indices = np.repeat(np.arange(count + 1), 2)[1:-1]
+    verts = [Vert(int(i), Co(*coords[i])) for i in indices]
+    return coords, indices, verts
+
+def main():
+    print('%-10s %9s %12s %12s %9s' % ('fold', 'segments', 'legacy (ms)', 'numpy (ms)', 'speedup'))
+    for kind in ('diagonal', 'vertical'):
+        for count in (1000, 10000, 100000):
+            coords, indices, verts = makeFold(count, kind)
+            repeat = max(1, 100000 // count)
+            legacy = timeit.timeit(lambda: legacyComputeBBox(verts), number=repeat) / repeat
+            vectorized = timeit.timeit(lambda: vectorizedComputeBBox(coords, indices), number=repeat) / repeat
+            print('%-10s %9d %12.3f %12.3f %8.1fx' % (kind, count, legacy * 1e3, vectorized * 1e3, legacy / vectorized))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+# Benchmark the fold pipeline on synthetic paper sheets
+#
+# Run inside Blender (or with the bpy module installed):
+#   blender -b --factory-startup -P benchmarks/benchFold.py -- --sizes 1000 10000 100000
+#   python benchmarks/benchFold.py --baseline benchmarks/baseline.json
+#
+# Every stage is timed (best of --repeat runs) and its Python/NumPy memory peak
+# recorded with tracemalloc. With --baseline the run fails (exit code 1) when a
+# stage is slower than the stored time by more than --tolerance; use
+# --save-baseline to record a new baseline on the machine that runs the checks.
+import argparse
+import importlib
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+import bmesh
+import bpy
+import numpy as np
+
+defaultSizes = [1000, 10000, 100000, 500000, 2000000]
+
+def loadAddon():
+    # Import the add-on package from the parent folder and register its operators
+    addonDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.path.dirname(addonDir))
+    addon = importlib.import_module(os.path.basename(addonDir))
+    addon.register()
+    return addon, importlib.import_module(addon.__name__ + '.foldUtils'), \
+        importlib.import_module(addon.__name__ + '.foldCache'), \
+        importlib.import_module(addon.__name__ + '.foldKernel')
+
+def makeSheet(vertCount):
+    # Square grid in the XY plane with about vertCount vertices
+    segments = max(2, int(round(np.sqrt(vertCount))) - 1)
+    mesh = bpy.data.meshes.new('Bench Paper %d' % vertCount)
+    bm = bmesh.new()
+    bmesh.ops.create_grid(bm, x_segments=segments, y_segments=segments, size=1.0)
+    bm.to_mesh(mesh)
+    bm.free()
+
+    obRoot = bpy.data.objects.new(mesh.name, mesh)
+    bpy.context.scene.collection.objects.link(obRoot)
+    bpy.context.view_layer.objects.active = obRoot
+    obRoot.select_set(True)
+    return obRoot
+
+def creaseEdges(obRoot, axis, offset):
+    # Grid edges lying on the line coordinate[axis] == offset
+    mesh = obRoot.data
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', coords)
+    coords = coords.reshape(-1, 3)
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', edges)
+    edges = edges.reshape(-1, 2)
+
+    # Snap to the nearest grid line
+    column = coords[np.argmin(np.abs(coords[:, axis] - offset)), axis]
+    onLine = np.abs(coords[:, axis] - column) < 1e-6
+    return np.flatnonzero(onLine[edges[:, 0]] & onLine[edges[:, 1]]), edges
+
+def selectEdges(obRoot, edgeIdx, edges):
+    mesh = obRoot.data
+    edgeMask = np.zeros(len(mesh.edges), dtype=bool)
+    edgeMask[edgeIdx] = True
+    vertMask = np.zeros(len(mesh.vertices), dtype=bool)
+    vertMask[edges[edgeIdx].ravel()] = True
+    mesh.vertices.foreach_set('select', vertMask)
+    mesh.edges.foreach_set('select', edgeMask)
+
+def measure(stage, repeat, setup = None):
+    # Best time over several runs, peak traced memory over all of them
+    best = float('inf')
+    tracemalloc.start()
+    for _ in range(repeat):
+        args = setup() if setup != None else ()
+        start = time.perf_counter()
+        stage(*args)
+        best = min(best, time.perf_counter() - start)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': best, 'peak_mb': peak / (1024 * 1024)}
+
+def benchSize(vertCount, repeat, modules, playbackFolds = 0, playbackFrames = 50, collideFolds = 0, collideFrames = 50):
+    addon, foldUtils, foldCache, foldKernel = modules
+    obRoot = makeSheet(vertCount)
+    mesh = obRoot.data
+    crease, edges = creaseEdges(obRoot, 0, 0.1)
+    selectEdges(obRoot, crease, edges)
+    v0, v1 = foldUtils.getSelectedVertices(mesh)
+    results = {}
+
+    results['getSelectedVertices'] = measure(lambda: foldUtils.getSelectedVertices(mesh), repeat)
+    results['groupVertices (cold)'] = measure(lambda: foldUtils.groupVertices(obRoot, v0, v1), repeat,
+        lambda: foldCache.invalidateCoords(obRoot) or ())
+    results['groupVertices (cached)'] = measure(lambda: foldUtils.groupVertices(obRoot, v0, v1), repeat)
+
+    planer, left, right, q, n = foldUtils.groupVertices(obRoot, v0, v1)
+    def createGroup():
+        foldUtils.createVertexGroup(obRoot, left, 'Bench Group', True)
+        obRoot.vertex_groups.remove(obRoot.vertex_groups['Bench Group'])
+    results['createVertexGroup'] = measure(createGroup, repeat)
+
+    foldNumber = [0]
+    def addFold():
+        foldNumber[0] = foldNumber[0] + 1
+        foldUtils.addSingleFoldArmature(900 + foldNumber[0], obRoot, 'LEFT', left, q, n)
+    results['addSingleFoldArmature'] = measure(addFold, repeat)
+
+    # End to end, through the registered operators on a second crease
+    crease, edges = creaseEdges(obRoot, 1, -0.2)
+    def operatorSetup():
+        selectEdges(obRoot, crease, edges)
+        bpy.context.view_layer.objects.active = obRoot
+        return ()
+    results['create_fold_left operator'] = measure(lambda: bpy.ops.object.create_fold_left(), repeat, operatorSetup)
+    results['create_fold_dual operator'] = measure(lambda: bpy.ops.object.create_fold_dual(), repeat, operatorSetup)
+
+    # Clean up so the next size starts from an empty file
+    armatureObj = obRoot.parent
+    bpy.data.objects.remove(obRoot)
+    bpy.data.meshes.remove(mesh)
+    if armatureObj != None:
+        armatureData = armatureObj.data
+        bpy.data.objects.remove(armatureObj)
+        bpy.data.armatures.remove(armatureData)
+
+    # Evaluated frames per second, constraint rig against the constraint free one
+    if playbackFolds > 0:
+        for rigMode in ('CONSTRAINTS', 'LOCKED'):
+            results['playback frame (%s)' % rigMode.lower()] = benchPlayback(vertCount, playbackFolds,
+                playbackFrames, rigMode, modules)
+
+    # Collision check over a whole frame range of a model folding flat
+    if collideFolds > 0:
+        results['findFoldCollisions (%d frames)' % collideFrames] = benchCollisions(vertCount, collideFolds,
+            collideFrames, modules)
+
+    return results
+
+def benchPlayback(vertCount, foldCount, frameCount, rigMode, modules):
+    # Frame evaluation rate of a rig with up to foldCount dual (linked) folds (one per grid column)
+    addon, foldUtils, foldCache, foldKernel = modules
+    obRoot = makeSheet(vertCount)
+    mesh = obRoot.data
+    creases = []
+    for offset in np.linspace(-0.9, 0.9, foldCount):
+        lineEdges, edges = creaseEdges(obRoot, 0, offset)
+        lineVerts = np.unique(edges[lineEdges])
+        crease = (int(lineVerts[0]), int(lineVerts[-1]), 'DUAL')
+        if crease not in creases:
+            creases.append(crease)
+    boneNames, armatureObj = foldUtils.rigFolds(obRoot, creases, rigMode=rigMode)
+
+    # Animate the left bone of every fold, the right bone follows through its link
+    for boneName in boneNames[::2]:
+        poseBone = armatureObj.pose.bones[boneName]
+        poseBone.rotation_mode = 'XYZ'
+        poseBone.rotation_euler[0] = 0.0
+        poseBone.keyframe_insert('rotation_euler', index=0, frame=1)
+        poseBone.rotation_euler[0] = 1.0
+        poseBone.keyframe_insert('rotation_euler', index=0, frame=frameCount)
+    if rigMode == 'LOCKED':
+        foldUtils.syncLinkedFolds(armatureObj)
+
+    scene = bpy.context.scene
+    scene.frame_set(1)
+    start = time.perf_counter()
+    for frame in range(1, frameCount + 1):
+        scene.frame_set(frame)
+    seconds = (time.perf_counter() - start) / frameCount
+
+    armatureData = armatureObj.data
+    bpy.data.objects.remove(obRoot)
+    bpy.data.meshes.remove(mesh)
+    bpy.data.objects.remove(armatureObj)
+    bpy.data.armatures.remove(armatureData)
+    return {'seconds': seconds, 'peak_mb': 0.0, 'fps': 1.0 / seconds}
+
+def benchCollisions(vertCount, foldCount, frameCount, modules):
+    # Left folds on grid columns, every one turning flat onto the sheet by the last frame
+    addon, foldUtils, foldCache, foldKernel = modules
+    foldCollide = importlib.import_module(addon.__name__ + '.foldCollide')
+    obRoot = makeSheet(vertCount)
+    mesh = obRoot.data
+    creases = []
+    for offset in np.linspace(-0.8, 0.8, foldCount):
+        lineEdges, edges = creaseEdges(obRoot, 0, offset)
+        lineVerts = np.unique(edges[lineEdges])
+        crease = (int(lineVerts[0]), int(lineVerts[-1]), 'LEFT')
+        if crease not in creases:
+            creases.append(crease)
+    boneNames, armatureObj = foldUtils.rigFolds(obRoot, creases)
+
+    for boneName in boneNames:
+        poseBone = armatureObj.pose.bones[boneName]
+        poseBone.rotation_mode = 'XYZ'
+        poseBone.rotation_euler[0] = 0.0
+        poseBone.keyframe_insert('rotation_euler', index=0, frame=1)
+        poseBone.rotation_euler[0] = np.pi
+        poseBone.keyframe_insert('rotation_euler', index=0, frame=frameCount)
+
+    start = time.perf_counter()
+    collisions = foldCollide.findFoldCollisions(bpy.context, obRoot, armatureObj, 1, frameCount)
+    seconds = time.perf_counter() - start
+
+    armatureData = armatureObj.data
+    bpy.data.objects.remove(obRoot)
+    bpy.data.meshes.remove(mesh)
+    bpy.data.objects.remove(armatureObj)
+    bpy.data.armatures.remove(armatureData)
+    return {'seconds': seconds, 'peak_mb': 0.0, 'pairs': len(collisions)}
+
+def compareBaseline(results, baseline, tolerance, minDelta):
+    regressions = []
+    for size, stages in results.items():
+        for stage, result in stages.items():
+            reference = baseline.get(size, {}).get(stage)
+            if reference == None:
+                continue
+            limit = max(reference['seconds'] * (1.0 + tolerance), reference['seconds'] + minDelta)
+            if result['seconds'] > limit:
+                regressions.append('%s @ %s verts: %.4fs (baseline %.4fs)' % (
+                    stage, size, result['seconds'], reference['seconds']))
+    return regressions
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the origami fold pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=defaultSizes, help="approximate vertex counts")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage (best time is kept)")
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--baseline', help="fail when slower than this stored result")
+    parser.add_argument('--save-baseline', action='store_true', help="write results to --baseline instead")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed relative slow down")
+    parser.add_argument('--min-delta', type=float, default=0.005, help="ignore slow downs below this many seconds")
+    parser.add_argument('--playback-folds', type=int, default=100, help="dual folds in the playback rig (0: skip)")
+    parser.add_argument('--playback-frames', type=int, default=50, help="frames evaluated for the playback rate")
+    parser.add_argument('--collide-folds', type=int, default=10, help="folds in the collision check model (0: skip)")
+    parser.add_argument('--collide-frames', type=int, default=50, help="frames in the collision check range")
+    parser.add_argument('--collide-max-verts', type=int, default=100000,
+        help="skip the collision check on larger sheets")
+    args = parser.parse_args(argv)
+
+    modules = loadAddon()
+    results = {}
+    print('%9s  %-28s %10s %10s' % ('verts', 'stage', 'seconds', 'peak MB'))
+    for size in args.sizes:
+        results[str(size)] = benchSize(size, args.repeat, modules, args.playback_folds, args.playback_frames,
+            args.collide_folds if size <= args.collide_max_verts else 0, args.collide_frames)
+        for stage, result in results[str(size)].items():
+            print('%9d  %-28s %10.4f %10.1f' % (size, stage, result['seconds'], result['peak_mb']) +
+                ('  (%.1f fps)' % result['fps'] if 'fps' in result else '') +
+                ('  (%d colliding pairs)' % result['pairs'] if 'pairs' in result else ''))
+
+    # ru_maxrss is in kilobytes on Linux
+    print('process peak RSS: %.1f MB' % (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+    elif args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compareBaseline(results, json.load(f), args.tolerance, args.min_delta)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if len(regressions) > 0:
+            return False
+
+    return True
+
+if __name__ == '__main__':
+    # Blender passes its own arguments first, ours follow '--'
+    argv = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else sys.argv[1:]
+    if not main(argv):
+        sys.exit(1)
@@ -0,0 +1,243 @@
+# Import system and blender modules
+import struct
+
+import bpy
+from bpy.props import BoolProperty, EnumProperty, IntProperty, StringProperty
+
+# Our own modules (and NumPy) are imported when the operator runs, keeping add-on startup fast
+
+def readDeformWeights(obRoot, armatureObj):
+    import numpy as np
+    from . import foldCache
+
+    # Vertex groups that belong to deforming bones of the armature
+    bones = armatureObj.data.bones
+    groupBone = np.full(len(obRoot.vertex_groups), -1, dtype=np.int64)
+    boneNames = []
+    for group in obRoot.vertex_groups:
+        bone = bones.get(group.name)
+        if bone != None and bone.use_deform:
+            groupBone[group.index] = len(boneNames)
+            boneNames.append(group.name)
+
+    # A single bone moves the vertex rigidly, several are blended
+    vertIdx, groupIdx, weights = foldCache.readVertexWeights(obRoot)
+    boneIdx = groupBone[groupIdx]
+    keep = (boneIdx >= 0) & (weights > 1e-4)
+    vertIdx, boneIdx, weights = vertIdx[keep], boneIdx[keep], weights[keep]
+    influences = np.bincount(vertIdx, minlength=len(obRoot.data.vertices))
+    boneOf = np.full(len(influences), -1, dtype=np.int64)
+    single = influences[vertIdx] == 1
+    boneOf[vertIdx[single]] = boneIdx[single]
+
+    mixed = (vertIdx[~single], boneIdx[~single], weights[~single])
+    return boneNames, boneOf, mixed
+
+class RigSampler:
+    """Bone transforms of a fold rig in the paper's object space, sampled frame by frame"""
+
+    def __init__(self, obRoot, armatureObj):
+        import numpy as np
+
+        self.obRoot = obRoot
+        self.armatureObj = armatureObj
+        self.boneNames, self.boneOf, self.mixed = readDeformWeights(obRoot, armatureObj)
+        restInverse = [np.array(armatureObj.data.bones[name].matrix_local.inverted()) for name in self.boneNames]
+        self.restInverse = np.array(restInverse).reshape(-1, 4, 4)
+
+        # Object space to armature space and back, as the armature modifier does it
+        self.toArmature = np.array(armatureObj.matrix_world.inverted() @ obRoot.matrix_world)
+        self.fromArmature = np.linalg.inv(self.toArmature)
+
+    def transformsAt(self, scene, frame):
+        import numpy as np
+
+        scene.frame_set(frame)
+        poseBones = self.armatureObj.pose.bones
+        pose = np.array([np.array(poseBones[name].matrix) for name in self.boneNames]).reshape(-1, 4, 4)
+        return self.fromArmature @ pose @ self.restInverse @ self.toArmature
+
+    def sample(self, scene, frames):
+        # Only the pose is needed, so the paper is kept out of the depsgraph while frames are evaluated
+        savedFrame = scene.frame_current
+        savedHide = self.obRoot.hide_viewport
+        self.obRoot.hide_viewport = True
+        try:
+            for frame in frames:
+                yield frame, self.transformsAt(scene, frame)
+        finally:
+            self.obRoot.hide_viewport = savedHide
+            scene.frame_set(savedFrame)
+
+class PointCacheWriter:
+    """Stream frames to a PC2 point cache file, one frame in memory at a time"""
+
+    def __init__(self, path, pointCount, startFrame, sampleRate, sampleCount):
+        self.file = open(path, 'wb')
+        self.file.write(struct.pack('<12siiffi', b'POINTCACHE2\0', 1, pointCount,
+            startFrame, sampleRate, sampleCount))
+
+    def write(self, coords):
+        coords.astype('<f4').tofile(self.file)
+
+    def close(self):
+        self.file.close()
+
+def addShapeKeyFrame(obRoot, name, coords):
+    # Absolute shape keys sit 0.1 apart on the key's evaluation time (reported as frame 10, 20, ...)
+    keyBlock = obRoot.shape_key_add(name=name, from_mix=False)
+    keyBlock.data.foreach_set('co', coords.astype('f4').ravel())
+    keyBlock.interpolation = 'KEY_LINEAR'
+    return keyBlock
+
+def animateShapeKeys(key, frameStart, frameEnd, firstBlock, lastBlock):
+    # Two linear keys on eval_time play every baked shape in order
+    key.eval_time = firstBlock.frame
+    key.keyframe_insert('eval_time', frame=frameStart)
+    key.eval_time = lastBlock.frame
+    key.keyframe_insert('eval_time', frame=frameEnd)
+    for fcurve in key.animation_data.action.fcurves:
+        if fcurve.data_path == 'eval_time':
+            for point in fcurve.keyframe_points:
+                point.interpolation = 'LINEAR'
+
+def dropArmatureDeform(obRoot):
+    # Keep following the armature object, but no longer deform with its bones
+    for modifier in [m for m in obRoot.modifiers if m.type == 'ARMATURE']:
+        obRoot.modifiers.remove(modifier)
+    if obRoot.parent_type == 'ARMATURE':
+        obRoot.parent_type = 'OBJECT'
+
+def bakeFoldRig(context, obRoot, armatureObj, frameStart, frameEnd, frameStep = 1, target = 'SHAPE_KEYS',
+        filepath = '', dropArmature = True):
+    import numpy as np
+    from . import foldCache, foldKernel, foldProfile
+
+    scene = context.scene
+    # Samples stay on the step grid, the point cache and the shape key timing both assume even spacing
+    frames = list(range(frameStart, frameEnd + 1, frameStep))
+
+    # Static per-vertex data is read once
+    with foldProfile.span('read weights'):
+        rest = foldCache.readLocalCoords(obRoot).astype(np.float64)
+        sampler = RigSampler(obRoot, armatureObj)
+        order, starts = foldKernel.groupByBone(sampler.boneOf, len(sampler.boneNames))
+        vertIdx, boneIdx, weights = sampler.mixed
+
+    writer = None
+    if target == 'PC2':
+        writer = PointCacheWriter(filepath, len(rest), frameStart, frameStep, len(frames))
+    else:
+        if obRoot.data.shape_keys == None:
+            obRoot.shape_key_add(name='Basis', from_mix=False)
+        obRoot.data.shape_keys.use_relative = False
+        blocks = []
+
+    # One output buffer is reused for every frame
+    out = np.empty_like(rest)
+    samples = sampler.sample(scene, frames)
+    try:
+        while True:
+            with foldProfile.span('evaluate rig'):
+                frame, transforms = next(samples, (None, None))
+            if frame == None:
+                break
+
+            with foldProfile.span('deform'):
+                foldKernel.rigidDeform(rest, order, starts, transforms, out)
+                foldKernel.blendDeform(rest, vertIdx, boneIdx, weights, transforms, out)
+
+            with foldProfile.span('write'):
+                if writer != None:
+                    writer.write(out)
+                else:
+                    blocks.append(addShapeKeyFrame(obRoot, 'Fold Bake %04d' % frame, out))
+    finally:
+        samples.close()
+        if writer != None:
+            writer.close()
+
+    # Play the bake back
+    if writer != None:
+        cache = obRoot.modifiers.new('Fold Bake', 'MESH_CACHE')
+        cache.cache_format = 'PC2'
+        cache.filepath = bpy.path.relpath(filepath) if bpy.data.filepath else filepath
+        cache.time_mode = 'FRAME'
+        cache.frame_start = frameStart
+        cache.frame_scale = 1.0 / frameStep
+    else:
+        animateShapeKeys(obRoot.data.shape_keys, frameStart, frames[-1], blocks[0], blocks[-1])
+
+    if dropArmature:
+        dropArmatureDeform(obRoot)
+
+    return len(frames)
+
+class BakeFoldRig(bpy.types.Operator):
+    """Bake the fold rig of the active paper to shape keys or a point cache for fast playback"""
+    bl_idname = "object.bake_fold_rig"
+    bl_label = "Bake Fold Rig"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    frameStart: IntProperty(name="Start Frame", description="First frame to bake", default=1)
+    frameEnd: IntProperty(name="End Frame", description="Last frame to bake", default=250)
+    frameStep: IntProperty(name="Frame Step", description="Bake every Nth frame (playback interpolates between them)",
+        default=1, min=1)
+    target: EnumProperty(
+        name="Bake To",
+        description="Where the baked vertex positions are stored",
+        items=[('SHAPE_KEYS', "Shape Keys", "One absolute shape key per baked frame, stored in the .blend file"),
+            ('PC2', "Point Cache (PC2)", "Stream frames to a .pc2 file played back by a Mesh Cache modifier")],
+        default='SHAPE_KEYS')
+    filepath: StringProperty(name="Cache File", description="PC2 file to write", subtype='FILE_PATH',
+        default="//fold_bake.pc2")
+    dropArmature: BoolProperty(name="Drop Armature",
+        description="Stop the armature from deforming the paper (otherwise the bake is added but the rig keeps deforming)",
+        default=True)
+
+    @classmethod
+    def poll(cls, context):
+        obRoot = context.object
+        return obRoot is not None and obRoot.type == 'MESH' and obRoot.parent is not None and \
+            obRoot.parent.type == 'ARMATURE'
+
+    def invoke(self, context, event):
+        self.frameStart = context.scene.frame_start
+        self.frameEnd = context.scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        from . import foldProfile
+
+        if context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        obRoot = context.active_object
+        if self.frameEnd < self.frameStart:
+            self.report({'ERROR'}, "End frame is before start frame")
+            return {'CANCELLED'}
+        if self.target == 'SHAPE_KEYS' and obRoot.data.shape_keys != None:
+            self.report({'ERROR'}, "%s already has shape keys, remove them before baking" % obRoot.name)
+            return {'CANCELLED'}
+
+        filepath = bpy.path.abspath(self.filepath)
+        with foldProfile.Profiler(self.bl_idname) as profiler:
+            try:
+                frameCount = bakeFoldRig(context, obRoot, obRoot.parent, self.frameStart, self.frameEnd,
+                    self.frameStep, self.target, filepath, self.dropArmature)
+            except OSError as err:
+                self.report({'ERROR'}, "Could not write point cache: %s" % err)
+                return {'CANCELLED'}
+
+        lastFrame = self.frameStart + (frameCount - 1) * self.frameStep
+        if lastFrame != self.frameEnd:
+            self.report({'INFO'}, "Baked %d frames, up to frame %d on the %d frame step (%s)" % (frameCount,
+                lastFrame, self.frameStep, profiler.summary()))
+        else:
+            self.report({'INFO'}, "Baked %d frames (%s)" % (frameCount, profiler.summary()))
+
+        # Indicate operator completed
+        return {'FINISHED'}
+
+# Setup self registration
+classes = [BakeFoldRig]
+register, unregister = bpy.utils.register_classes_factory(classes)
@@ -0,0 +1,218 @@
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+
+from . import foldKernel
+
+# World space coordinates per (object, mesh) pointer pair
+worldCoords = {}
+coordStats = {'hits': 0, 'misses': 0}
+
+# Face regions between creases per mesh pointer
+flapRegions = {}
+
+# Per-object bitmap of vertices already bound to a vertex group, keyed by object pointer
+weightedVerts = {}
+
+# Handlers are installed the first time a cache is used, not when the add-on is enabled
+handlersInstalled = False
+
+def weightedToken(obRoot):
+    # Cheap check that nobody replaced the mesh or added/removed groups behind our back
+    return (obRoot.data.as_pointer(), len(obRoot.data.vertices),
+        tuple(group.name for group in obRoot.vertex_groups))
+
+def getWeightedMask(obRoot):
+    register()
+    key = obRoot.as_pointer()
+    entry = weightedVerts.get(key)
+    if entry == None or entry['dirty'] or entry['token'] != weightedToken(obRoot):
+        # Rebuild from the mesh (the only per-vertex pass)
+        vertIdx, groupIdx, weights = readVertexWeights(obRoot)
+        mask = np.bincount(vertIdx, minlength=len(obRoot.data.vertices)) > 0
+        entry = {'token': weightedToken(obRoot), 'mask': mask, 'dirty': False}
+        weightedVerts[key] = entry
+
+    return entry['mask']
+
+def markWeighted(obRoot, indices):
+    # Update the bitmap in place right after a vertex group was created
+    # (the bitmap must have been validated with getWeightedMask just before)
+    key = obRoot.as_pointer()
+    entry = weightedVerts.get(key)
+    if entry == None:
+        return
+    entry['mask'][indices] = True
+    entry['token'] = weightedToken(obRoot)
+
+def invalidateWeighted(obRoot = None):
+    # Drop one object's bitmap (or all of them) so it is rebuilt on next use
+    if obRoot == None:
+        weightedVerts.clear()
+    else:
+        weightedVerts.pop(obRoot.as_pointer(), None)
+
+def readVertexWeights(obRoot):
+    # Vertex group weights as flat (vertex, group, weight) arrays. MeshVertex.groups is out of reach of
+    # foreach_get, so this is the one pass over the vertices and everything after it works on the arrays
+    meshVerts = obRoot.data.vertices
+    flat = np.array([(v.index, g.group, g.weight) for v in meshVerts for g in v.groups], dtype=np.float64)
+    flat = flat.reshape(-1, 3)
+    return flat[:, 0].astype(np.int64), flat[:, 1].astype(np.int64), flat[:, 2]
+
+def readLocalCoords(obRoot):
+    # Pull every vertex coordinate out of the mesh in one bulk copy
+    mesh = obRoot.data
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', coords)
+    return coords.reshape(-1, 3)
+
+def getWorldCoords(obRoot):
+    register()
+    key = (obRoot.as_pointer(), obRoot.data.as_pointer())
+    matrix = np.array(obRoot.matrix_world, dtype=np.float64)
+    token = (len(obRoot.data.vertices), matrix.tobytes())
+
+    # Reuse the transformed array while vertex count and transform are unchanged
+    entry = worldCoords.get(key)
+    local = None
+    if entry != None and entry['token'] == token:
+        if not entry['dirty']:
+            coordStats['hits'] = coordStats['hits'] + 1
+            return entry['world']
+
+        # Geometry was tagged as updated (this also happens for selection-only
+        # edits), so only rebuild if the coordinates really changed
+        local = readLocalCoords(obRoot)
+        if np.array_equal(local, entry['local']):
+            entry['dirty'] = False
+            coordStats['hits'] = coordStats['hits'] + 1
+            return entry['world']
+
+    if local is None:
+        local = readLocalCoords(obRoot)
+    world = foldKernel.worldTransform(local, matrix)
+    world.flags.writeable = False
+
+    worldCoords[key] = {'token': token, 'local': local, 'world': world, 'dirty': False}
+    coordStats['misses'] = coordStats['misses'] + 1
+    return world
+
+def buildFlapRegions(mesh, loopVerts, seams):
+    loopTotal = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get('loop_total', loopTotal)
+    loopEdges = np.empty(len(mesh.loops), dtype=np.int32)
+    mesh.loops.foreach_get('edge_index', loopEdges)
+    return foldKernel.faceRegions(loopVerts, loopTotal, loopEdges, len(mesh.edges), len(mesh.vertices), seams)
+
+def getFlapRegions(obRoot):
+    register()
+    mesh = obRoot.data
+    key = mesh.as_pointer()
+    token = (len(mesh.vertices), len(mesh.edges), len(mesh.loops), len(mesh.polygons))
+
+    # Creases are the edges marked as seams
+    seams = np.empty(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get('use_seam', seams)
+
+    # Reuse the regions while the topology is unchanged
+    entry = flapRegions.get(key)
+    loopVerts = None
+    if entry != None and entry['token'] == token:
+        reuse = not entry['dirty']
+        if not reuse:
+            # Geometry was updated, check whether the faces really changed
+            loopVerts = np.empty(len(mesh.loops), dtype=np.int32)
+            mesh.loops.foreach_get('vertex_index', loopVerts)
+            reuse = np.array_equal(loopVerts, entry['regions']['loopVerts'])
+
+        # Every flap fold adds its crease as a seam, which only splits the regions it cuts through
+        if reuse and not np.any(entry['seams'] & ~seams):
+            added = np.flatnonzero(seams & ~entry['seams'])
+            if len(added) > 0:
+                entry['regions'] = foldKernel.splitRegions(entry['regions'], seams, added, len(mesh.vertices))
+                entry['seams'] = seams
+            entry['dirty'] = False
+            return entry['regions']
+
+    if loopVerts is None:
+        loopVerts = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loopVerts)
+    regions = buildFlapRegions(mesh, loopVerts, seams)
+    flapRegions[key] = {'token': token, 'seams': seams, 'regions': regions, 'dirty': False}
+    return regions
+
+def invalidateCoords(obRoot = None):
+    # Drop one object's coordinates (or all of them)
+    if obRoot == None:
+        worldCoords.clear()
+    else:
+        pointer = obRoot.as_pointer()
+        for key in [key for key in worldCoords if key[0] == pointer]:
+            del worldCoords[key]
+
+def snapshotStats():
+    return coordStats['hits'], coordStats['misses']
+
+def describeStats(before):
+    hits = coordStats['hits'] - before[0]
+    misses = coordStats['misses'] - before[1]
+    return "coordinate cache: %d hit%s, %d miss%s" % (hits, '' if hits == 1 else 's',
+        misses, '' if misses == 1 else 'es')
+
+@persistent
+def onDepsgraphUpdate(scene, depsgraph):
+    if len(worldCoords) == 0 and len(flapRegions) == 0 and len(weightedVerts) == 0:
+        return
+
+    # Flag entries whose object or mesh had its geometry updated
+    updated = set()
+    for update in depsgraph.updates:
+        if update.is_updated_geometry:
+            updated.add(update.id.original.as_pointer())
+    for key, entry in worldCoords.items():
+        if key[0] in updated or key[1] in updated:
+            entry['dirty'] = True
+    for key, entry in flapRegions.items():
+        if key in updated:
+            entry['dirty'] = True
+
+    # Weights edited in Edit Mode or Weight Paint come through as geometry updates too
+    for key, entry in weightedVerts.items():
+        if key in updated or entry['token'][0] in updated:
+            entry['dirty'] = True
+
+    # Evict objects that were deleted
+    live = set(ob.as_pointer() for ob in bpy.data.objects)
+    for key in [key for key in worldCoords if key[0] not in live]:
+        del worldCoords[key]
+    for key in [key for key in weightedVerts if key not in live]:
+        del weightedVerts[key]
+    liveMeshes = set(mesh.as_pointer() for mesh in bpy.data.meshes)
+    for key in [key for key in flapRegions if key not in liveMeshes]:
+        del flapRegions[key]
+
+@persistent
+def onLoadPre(dummy):
+    # Pointers are meaningless once another file is loaded
+    invalidateCoords()
+    invalidateWeighted()
+    flapRegions.clear()
+
+def register():
+    global handlersInstalled
+    if handlersInstalled:
+        return
+    bpy.app.handlers.depsgraph_update_post.append(onDepsgraphUpdate)
+    bpy.app.handlers.load_pre.append(onLoadPre)
+    handlersInstalled = True
+
+def unregister():
+    global handlersInstalled
+    if handlersInstalled:
+        bpy.app.handlers.depsgraph_update_post.remove(onDepsgraphUpdate)
+        bpy.app.handlers.load_pre.remove(onLoadPre)
+        handlersInstalled = False
+    invalidateCoords()
+    invalidateWeighted()
+    flapRegions.clear()
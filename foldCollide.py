@@ -0,0 +1,225 @@
+# Import blender modules
+import bpy
+from bpy.props import BoolProperty, FloatProperty, IntProperty
+
+# Our own modules (and NumPy) are imported when the operator runs, keeping add-on startup fast
+
+class FlapTree:
+    """One rigid flap of the paper: a BVH tree of its faces at rest and the edges used to query others"""
+
+    def __init__(self, rest, faces, edges):
+        import numpy as np
+        from mathutils.bvhtree import BVHTree
+
+        # The tree only holds the flap's own vertices, in rest (object) space
+        faceVerts = np.concatenate(faces) if len(faces) > 0 else np.zeros(0, dtype=np.int64)
+        self.verts, local = np.unique(faceVerts, return_inverse=True)
+        sizes = np.cumsum([len(face) for face in faces])[:-1]
+        self.polygons = [polygon.tolist() for polygon in np.split(local, sizes)] if len(faces) > 0 else []
+        self.tree = BVHTree.FromPolygons(rest[self.verts].tolist(), self.polygons)
+
+        # Hits on faces sharing a vertex with the edge are the hinge itself, not a collision
+        self.faces = faces
+        self.faceVerts = [face.tolist() for face in faces]
+        self.edges = edges
+        self.empty = len(faces) == 0
+
+    def candidateEdges(self, rest, source, relative, margin):
+        # Faces of both flaps whose triangles meet, found in one BVH overlap test with the other flap moved
+        # into this flap's rest space, and the edges of those faces (only these are ray cast)
+        import numpy as np
+        from mathutils.bvhtree import BVHTree
+
+        moved = rest[source.verts] @ relative[:3, :3].T + relative[:3, 3]
+        pairs = np.array(self.tree.overlap(BVHTree.FromPolygons(moved.tolist(), source.polygons, epsilon=margin)),
+            dtype=np.int64).reshape(-1, 2)
+
+        def faceEdges(flap, faces):
+            if len(faces) == 0:
+                return flap.edges[:0]
+            verts = np.unique(np.concatenate([flap.faces[face] for face in np.unique(faces).tolist()]))
+            return flap.edges[np.isin(flap.edges, verts).all(axis=1)]
+        return faceEdges(self, pairs[:, 0]), faceEdges(source, pairs[:, 1])
+
+    def edgeHits(self, rest, edges, relative, boxMin, boxMax, margin):
+        # Cast edges of another flap, moved into this flap's rest space, against this flap's faces
+        from . import foldKernel
+
+        ends = rest[edges] @ relative[:3, :3].T + relative[:3, 3]
+        near = foldKernel.segmentsNearBox(ends[:, 0], ends[:, 1], boxMin, boxMax, margin)
+        hitVerts = set()
+        for i in near.tolist():
+            start, end = ends[i]
+            direction = end - start
+            length = float((direction @ direction) ** 0.5)
+            if length <= 2 * margin:
+                continue
+            direction = direction / length
+            edge = edges[i].tolist()
+
+            # Both ways along the edge, the first face hit from one end may be a hinge face
+            for origin, way in ((start, direction), (end, -direction)):
+                location, normal, face, distance = self.tree.ray_cast((origin + way * margin).tolist(),
+                    way.tolist(), length - 2 * margin)
+                if face != None and edge[0] not in self.faceVerts[face] and edge[1] not in self.faceVerts[face]:
+                    hitVerts.update(edge)
+                    hitVerts.update(self.faceVerts[face])
+                    break
+        return hitVerts
+
+def buildFlaps(obRoot, armatureObj, boneNames, boneOf):
+    import numpy as np
+    from . import foldCache, foldKernel
+
+    mesh = obRoot.data
+    rest = foldCache.readLocalCoords(obRoot).astype(np.float64)
+    loopVerts = np.empty(len(mesh.loops), dtype=np.int64)
+    mesh.loops.foreach_get('vertex_index', loopVerts)
+    loopStart = np.empty(len(mesh.polygons), dtype=np.int64)
+    mesh.polygons.foreach_get('loop_start', loopStart)
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int64)
+    mesh.edges.foreach_get('vertices', edges)
+    edges = edges.reshape(-1, 2)
+
+    # Nested folds hand their hinge verts to the parent bone, so faces go to the deepest bone they touch
+    bones = armatureObj.data.bones
+    depth = np.array([len(bones[name].parent_recursive) for name in boneNames], dtype=np.int64)
+    faceFlap = foldKernel.faceFlaps(loopVerts, loopStart, boneOf, depth) + 1
+
+    # Flap 0 is the paper that stays put, flap i + 1 turns with bone i
+    flapCount = len(boneNames) + 1
+    boxMin, boxMax = foldKernel.flapBounds(rest, loopVerts, loopStart, faceFlap, flapCount)
+    faces = np.split(loopVerts, loopStart[1:])
+    order, starts = foldKernel.groupByBone(faceFlap, flapCount)
+    flaps = []
+    for flap in range(flapCount):
+        flapFaces = [faces[face] for face in order[starts[flap]:starts[flap + 1]].tolist()]
+        inFlap = np.zeros(len(rest), dtype=bool)
+        if len(flapFaces) > 0:
+            inFlap[np.concatenate(flapFaces)] = True
+        flaps.append(FlapTree(rest, flapFaces, edges[inFlap[edges[:, 0]] & inFlap[edges[:, 1]]]))
+
+    return rest, flaps, boxMin, boxMax
+
+def findFoldCollisions(context, obRoot, armatureObj, frameStart, frameEnd, frameStep = 1, margin = 1e-4):
+    import numpy as np
+    from . import foldBake, foldKernel, foldProfile
+
+    scene = context.scene
+    frames = list(range(frameStart, frameEnd + 1, frameStep))
+
+    # Trees are built once at rest, flaps only ever move rigidly
+    with foldProfile.span('build trees'):
+        sampler = foldBake.RigSampler(obRoot, armatureObj)
+        rest, flaps, boxMin, boxMax = buildFlaps(obRoot, armatureObj, sampler.boneNames, sampler.boneOf)
+
+    # Per flap pair: frames with a hit, colliding vertices and results by relative transform
+    hits = {}
+    known = {}
+    for frame, transforms in sampler.sample(scene, frames):
+        with foldProfile.span('test pairs'):
+            flapTransforms = np.concatenate([np.eye(4)[None], transforms])
+            worldMin, worldMax = foldKernel.transformedBounds(boxMin, boxMax, flapTransforms)
+            for a, b in foldKernel.overlappingPairs(worldMin, worldMax, margin).tolist():
+                if flaps[a].empty or flaps[b].empty:
+                    continue
+
+                # Flaps held still against each other collide exactly as they did before
+                relative = np.linalg.inv(flapTransforms[a]) @ flapTransforms[b]
+                key = (a, b, np.round(relative, 6).tobytes())
+                verts = known.get(key)
+                if verts == None:
+                    edgesA, edgesB = flaps[a].candidateEdges(rest, flaps[b], relative, margin)
+                    verts = flaps[a].edgeHits(rest, edgesB, relative, boxMin[a], boxMax[a], margin)
+                    verts = verts.union(flaps[b].edgeHits(rest, edgesA, np.linalg.inv(relative),
+                        boxMin[b], boxMax[b], margin))
+                    known[key] = verts
+
+                if len(verts) > 0:
+                    frameHits, pairVerts = hits.setdefault((a, b), (set(), set()))
+                    frameHits.add(frame)
+                    pairVerts.update(verts)
+
+    # Named pairs with the frame ranges they intersect in
+    flapNames = ['(static)'] + sampler.boneNames
+    collisions = []
+    for (a, b), (frameHits, pairVerts) in sorted(hits.items()):
+        ranges = foldKernel.frameRanges(frames, [frame in frameHits for frame in frames])
+        collisions.append((flapNames[a], flapNames[b], ranges, np.array(sorted(pairVerts), dtype=np.int64)))
+    return collisions
+
+def selectVertices(obRoot, verts):
+    import numpy as np
+
+    mesh = obRoot.data
+    mask = np.zeros(len(mesh.vertices), dtype=bool)
+    mask[verts] = True
+    mesh.vertices.foreach_set('select', mask)
+    mesh.update()
+
+class CheckFoldCollisions(bpy.types.Operator):
+    """Find the frames where flaps of the active paper pass through each other"""
+    bl_idname = "object.check_fold_collisions"
+    bl_label = "Check Fold Collisions"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    frameStart: IntProperty(name="Start Frame", description="First frame to check", default=1)
+    frameEnd: IntProperty(name="End Frame", description="Last frame to check", default=250)
+    frameStep: IntProperty(name="Frame Step", description="Check every Nth frame", default=1, min=1)
+    margin: FloatProperty(name="Contact Tolerance",
+        description="Touching closer than this is not a collision (flat folds lie right on each other)",
+        default=1e-4, min=0.0, precision=5)
+    selectHits: BoolProperty(name="Select Vertices", description="Select the vertices that collide", default=True)
+    addMarkers: BoolProperty(name="Add Markers", description="Add a timeline marker where each collision starts",
+        default=False)
+
+    @classmethod
+    def poll(cls, context):
+        obRoot = context.object
+        return obRoot is not None and obRoot.type == 'MESH' and obRoot.parent is not None and \
+            obRoot.parent.type == 'ARMATURE'
+
+    def invoke(self, context, event):
+        self.frameStart = context.scene.frame_start
+        self.frameEnd = context.scene.frame_end
+        return context.window_manager.invoke_props_dialog(self)
+
+    def execute(self, context):
+        import numpy as np
+        from . import foldProfile
+
+        if context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        obRoot = context.active_object
+        if self.frameEnd < self.frameStart:
+            self.report({'ERROR'}, "End frame is before start frame")
+            return {'CANCELLED'}
+
+        with foldProfile.Profiler(self.bl_idname) as profiler:
+            collisions = findFoldCollisions(context, obRoot, obRoot.parent, self.frameStart, self.frameEnd,
+                self.frameStep, self.margin)
+
+        # Full list on the console, a summary in the status bar
+        for nameA, nameB, ranges, verts in collisions:
+            frameText = ', '.join(['%d' % s if s == e else '%d-%d' % (s, e) for s, e in ranges])
+            print('%s / %s: frames %s, %d vertices' % (nameA, nameB, frameText, len(verts)))
+            if self.addMarkers:
+                for start, end in ranges:
+                    context.scene.timeline_markers.new('%s / %s' % (nameA, nameB), frame=start)
+
+        if self.selectHits:
+            verts = [verts for nameA, nameB, ranges, verts in collisions]
+            selectVertices(obRoot, np.concatenate(verts) if len(verts) > 0 else np.zeros(0, dtype=np.int64))
+
+        if len(collisions) == 0:
+            self.report({'INFO'}, "No collisions (%s)" % profiler.summary())
+        else:
+            self.report({'WARNING'}, "%d flap pairs collide, see the console (%s)" % (len(collisions),
+                profiler.summary()))
+
+        # Indicate operator completed
+        return {'FINISHED'}
+
+# Setup self registration
+classes = [CheckFoldCollisions]
+register, unregister = bpy.utils.register_classes_factory(classes)
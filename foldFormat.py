@@ -0,0 +1,268 @@
+import json
+import re
+from array import array
+
+import numpy as np
+
+from . import foldKernel
+
+# Edge assignment letters from the FOLD spec and the small codes we store them as
+ASSIGNMENT_CODES = {'B': 0, 'M': 1, 'V': 2, 'F': 3, 'U': 4, 'C': 5, 'J': 6}
+MOUNTAIN = ASSIGNMENT_CODES['M']
+VALLEY = ASSIGNMENT_CODES['V']
+
+_whitespace = re.compile(r'[ \t\n\r]*')
+_delimiters = ' \t\n\r,:]}'
+_decoder = json.JSONDecoder()
+
+class FoldFormatError(ValueError):
+    pass
+
+class FlatFoldError(FoldFormatError):
+    pass
+
+class _JsonStream:
+    """Minimal pull parser that reads one JSON value at a time from a file"""
+
+    def __init__(self, f, chunkSize = 1 << 20):
+        self.f = f
+        self.chunkSize = chunkSize
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        # Drop consumed text and append the next chunk
+        chunk = self.f.read(self.chunkSize)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return bool(chunk)
+
+    def peek(self):
+        # Skip whitespace and return next character ('' at end of file)
+        while True:
+            self.pos = _whitespace.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, ch):
+        if self.peek() != ch:
+            raise FoldFormatError("Expected '%s' at offset %d" % (ch, self.pos))
+        self.pos += 1
+
+    def value(self):
+        # Decode one complete value, refilling when it runs off the buffer end
+        self.peek()
+        while True:
+            try:
+                obj, end = _decoder.raw_decode(self.buf, self.pos)
+                # A number cut at the buffer end (e.g. '1.') might continue in the next chunk
+                if self.eof or (end < len(self.buf) and self.buf[end] in _delimiters):
+                    self.pos = end
+                    return obj
+            except json.JSONDecodeError as err:
+                if self.eof:
+                    raise FoldFormatError(str(err))
+            self._fill()
+
+    def items(self):
+        # Iterate over an array, caller must consume each element
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield
+            ch = self.peek()
+            self.pos += 1
+            if ch == ']':
+                return
+            if ch != ',':
+                raise FoldFormatError("Expected ',' or ']' at offset %d" % (self.pos - 1))
+
+    def members(self):
+        # Iterate over object keys, caller must consume each value
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(':')
+            yield key
+            ch = self.peek()
+            self.pos += 1
+            if ch == '}':
+                return
+            if ch != ',':
+                raise FoldFormatError("Expected ',' or '}' at offset %d" % (self.pos - 1))
+
+    def skip(self):
+        # Walk over containers without building them
+        ch = self.peek()
+        if ch == '[':
+            for _ in self.items():
+                self.skip()
+        elif ch == '{':
+            for _ in self.members():
+                self.skip()
+        else:
+            self.value()
+
+def readFoldFile(filepath):
+    # Flat typed buffers, filled one element at a time
+    coords, coordDims = array('d'), set()
+    edges = array('q')
+    assignment = array('b')
+    foldAngle = array('d')
+    faces, faceSizes = array('q'), array('q')
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        stream = _JsonStream(f)
+        for key in stream.members():
+            if key == 'vertices_coords':
+                for _ in stream.items():
+                    co = stream.value()
+                    coordDims.add(len(co))
+                    coords.extend(co)
+            elif key == 'edges_vertices':
+                for _ in stream.items():
+                    edges.extend(stream.value())
+            elif key == 'edges_assignment':
+                for _ in stream.items():
+                    assignment.append(ASSIGNMENT_CODES.get(stream.value().upper(), ASSIGNMENT_CODES['U']))
+            elif key == 'edges_foldAngle':
+                for _ in stream.items():
+                    angle = stream.value()
+                    foldAngle.append(float('nan') if angle is None else angle)
+            elif key == 'faces_vertices':
+                for _ in stream.items():
+                    face = stream.value()
+                    faceSizes.append(len(face))
+                    faces.extend(face)
+            else:
+                stream.skip()
+
+    # Validate and convert to arrays (2D patterns are placed on the XY plane)
+    if len(coordDims) > 1 or coordDims - {2, 3}:
+        raise FoldFormatError('vertices_coords must all be 2D or all be 3D')
+    dim = coordDims.pop() if coordDims else 3
+    coords = np.frombuffer(coords, dtype=np.float64).reshape(-1, dim)
+    if dim == 2:
+        coords = np.hstack([coords, np.zeros((len(coords), 1))])
+
+    if len(edges) % 2 != 0:
+        raise FoldFormatError('edges_vertices entries must have two vertices')
+    edges = np.frombuffer(edges, dtype=np.int64).reshape(-1, 2)
+    if len(edges) > 0 and (edges.min() < 0 or edges.max() >= len(coords)):
+        raise FoldFormatError('edges_vertices refers to a missing vertex')
+
+    # Missing per-edge fields default to unassigned and unknown angle
+    assignment = np.frombuffer(assignment, dtype=np.int8)
+    if len(assignment) == 0:
+        assignment = np.full(len(edges), ASSIGNMENT_CODES['U'], dtype=np.int8)
+    foldAngle = np.frombuffer(foldAngle, dtype=np.float64)
+    if len(foldAngle) == 0:
+        foldAngle = np.full(len(edges), np.nan)
+    if len(assignment) != len(edges) or len(foldAngle) != len(edges):
+        raise FoldFormatError('Edge fields must have one entry per edge')
+
+    # Faces are optional in the spec, without them the paper is the regions the edges enclose
+    faces = np.frombuffer(faces, dtype=np.int64)
+    faceSizes = np.frombuffer(faceSizes, dtype=np.int64)
+    if len(faceSizes) == 0 and len(edges) > 0:
+        flat = coords[:, :2] if np.ptp(coords[:, 2]) == 0 else foldKernel.planarCoords(coords)
+        faces, faceSizes = foldKernel.planarFaces(flat, edges)
+    if len(faceSizes) == 0:
+        raise FoldFormatError('Pattern has no faces_vertices and its edges enclose no faces')
+
+    return {
+        'vertices_coords': coords,
+        'edges_vertices': edges,
+        'edges_assignment': assignment,
+        'edges_foldAngle': foldAngle,
+        'faces_vertices': faces,
+        'faces_sizes': faceSizes
+    }
+
+def creaseLines(data, tol = 1e-5):
+    coords = data['vertices_coords']
+    edges = data['edges_vertices']
+    assignment = data['edges_assignment']
+
+    # Only mountain and valley edges are folded
+    creaseIdx = np.flatnonzero((assignment == MOUNTAIN) | (assignment == VALLEY))
+    if len(creaseIdx) == 0:
+        return []
+    p0 = coords[edges[creaseIdx, 0]]
+    p1 = coords[edges[creaseIdx, 1]]
+
+    # Canonical line direction (first significant component positive)
+    d = p1 - p0
+    d = d / np.linalg.norm(d, axis=1, keepdims=True)
+    lead = np.argmax(np.abs(d) > 1e-9, axis=1)
+    d = d * np.sign(d[np.arange(len(d)), lead])[:, None]
+
+    # Closest point on the line to the origin identifies the line offset
+    offset = p0 - np.sum(p0 * d, axis=1, keepdims=True) * d
+
+    # Edges on the same line with the same assignment form one fold
+    key = np.hstack([np.round(d / tol), np.round(offset / tol), assignment[creaseIdx, None]])
+    _, lineOf = np.unique(key, axis=0, return_inverse=True)
+    lineOf = lineOf.reshape(-1)
+
+    # Sort once so every line is a contiguous run of crease edges
+    order = np.argsort(lineOf, kind='stable')
+    starts = np.flatnonzero(np.diff(lineOf[order], prepend=-1))
+
+    lines = []
+    foldAngle = data['edges_foldAngle']
+    for run in np.split(order, starts[1:]):
+        lineEdges = creaseIdx[run]
+        lineVerts = np.unique(edges[lineEdges])
+
+        # Endpoints are the extreme projections along the line
+        t = coords[lineVerts] @ d[run[0]]
+        v0, v1 = lineVerts[np.argmin(t)], lineVerts[np.argmax(t)]
+
+        # Use recorded angle if any, otherwise fully folded (valley positive)
+        angles = foldAngle[lineEdges]
+        angles = angles[~np.isnan(angles)]
+        code = assignment[lineEdges[0]]
+        if len(angles) > 0:
+            angle = float(angles.mean())
+        else:
+            angle = 180.0 if code == VALLEY else -180.0
+
+        lines.append((int(v0), int(v1), lineEdges, int(code), angle))
+
+    # Keep file order of first edge on each line
+    lines.sort(key=lambda line: line[2][0])
+    return lines
+
+def flatFoldFailures(data, tol = 1e-4):
+    coords = data['vertices_coords']
+    edges = data['edges_vertices']
+    assignment = data['edges_assignment']
+
+    # Interior vertices: off the boundary edges, or off the face outline when no edge is marked as boundary
+    boundary = assignment == ASSIGNMENT_CODES['B']
+    if boundary.any():
+        interior = np.ones(len(coords), dtype=bool)
+        interior[edges[boundary].ravel()] = False
+    elif len(data['faces_sizes']) > 0:
+        faceStarts = np.cumsum(data['faces_sizes']) - data['faces_sizes']
+        interior = ~foldKernel.boundaryVertices(data['faces_vertices'], faceStarts, len(coords))
+    else:
+        interior = np.ones(len(coords), dtype=bool)
+
+    # Unassigned creases may fold either way, they count towards the degree but skip Maekawa
+    creases = (assignment == MOUNTAIN) | (assignment == VALLEY) | (assignment == ASSIGNMENT_CODES['U'])
+    verts, flags, kawasaki, mountains, valleys = foldKernel.flatFoldCheck(foldKernel.planarCoords(coords),
+        edges[creases], assignment[creases] == MOUNTAIN, assignment[creases] == VALLEY, interior, tol)
+    failing = flags != 0
+    return verts[failing], flags[failing], kawasaki[failing], mountains[failing], valleys[failing]
@@ -0,0 +1,139 @@
+# Import system and blender modules
+import os
+
+import bpy
+from bpy.props import BoolProperty, EnumProperty, StringProperty
+from bpy_extras.io_utils import ImportHelper
+
+# Our own modules (and NumPy) are imported when the operator runs, keeping add-on startup fast
+
+def buildFoldMesh(name, data):
+    import numpy as np
+    from . import foldFormat
+
+    coords = data['vertices_coords']
+    edges = data['edges_vertices']
+    faces = data['faces_vertices']
+    faceSizes = data['faces_sizes']
+
+    # Fill mesh arrays in bulk rather than one element at a time
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(coords))
+    mesh.vertices.foreach_set('co', coords.astype(np.float32).ravel())
+    mesh.edges.add(len(edges))
+    mesh.edges.foreach_set('vertices', edges.astype(np.int32).ravel())
+
+    # Faces give the vertex normals the fold planes are built from
+    mesh.loops.add(len(faces))
+    mesh.loops.foreach_set('vertex_index', faces.astype(np.int32))
+    mesh.polygons.add(len(faceSizes))
+    mesh.polygons.foreach_set('loop_start', (np.cumsum(faceSizes) - faceSizes).astype(np.int32))
+    if bpy.app.version < (4, 0, 0):
+        # Blender 4 derives the face sizes from the loop starts (loop_total is read-only there)
+        mesh.polygons.foreach_set('loop_total', faceSizes.astype(np.int32))
+
+    mesh.update(calc_edges=True)
+    mesh.validate()
+
+    # Edges may have been reordered, so find the creases again by their vertex pairs
+    meshEdges = np.empty(len(mesh.edges) * 2, dtype=np.int32)
+    mesh.edges.foreach_get('vertices', meshEdges)
+    meshEdges = np.sort(meshEdges.reshape(-1, 2), axis=1).astype(np.int64)
+
+    assignment = data['edges_assignment']
+    creases = np.sort(edges[(assignment == foldFormat.MOUNTAIN) | (assignment == foldFormat.VALLEY)], axis=1)
+    vertCount = len(coords)
+    isCrease = np.isin(meshEdges[:, 0] * vertCount + meshEdges[:, 1], creases[:, 0] * vertCount + creases[:, 1])
+
+    # Creases are marked as seams so they can be found again later
+    mesh.edges.foreach_set('use_seam', isCrease)
+
+    return mesh
+
+def rigCreasePattern(obRoot, lines, firstFold, side, collection):
+    from . import foldFormat, foldUtils
+
+    # One armature for the whole pattern
+    armatureObj = foldUtils.makeArmature('Fold %03d' % firstFold, obRoot.location)
+    collection.objects.link(armatureObj)
+    foldUtils.parentToArmature(obRoot, armatureObj)
+
+    # Partition all creases together, then create every bone in one batch
+    creases = [(v0, v1, side) for v0, v1, _, _, _ in lines]
+    boneNames, _ = foldUtils.rigFolds(obRoot, creases, firstFold)
+
+    # Remember crease type and target angle on each bone
+    boneLines = lines if side != 'DUAL' else [line for line in lines for _ in range(2)]
+    for boneName, (_, _, _, code, angle) in zip(boneNames, boneLines):
+        bone = armatureObj.data.bones[boneName]
+        bone['origami_assignment'] = 'M' if code == foldFormat.MOUNTAIN else 'V'
+        bone['origami_fold_angle'] = angle
+
+    return armatureObj
+
+def importFoldFile(filepath, collection, firstFold = 1, side = 'LEFT', requireFlat = False):
+    from . import foldFormat
+
+    # Read and group creases before touching any blender data
+    data = foldFormat.readFoldFile(filepath)
+    if requireFlat:
+        verts = foldFormat.flatFoldFailures(data)[0]
+        if len(verts) > 0:
+            raise foldFormat.FlatFoldError('pattern cannot fold flat at %d vertices (first: %s)' % (
+                len(verts), ', '.join(str(vert) for vert in verts[:5].tolist())))
+    lines = foldFormat.creaseLines(data)
+
+    # Build paper object
+    name = os.path.splitext(os.path.basename(filepath))[0]
+    obRoot = bpy.data.objects.new(name, buildFoldMesh(name, data))
+    collection.objects.link(obRoot)
+
+    # Rig all the creases in one pass
+    if len(lines) > 0:
+        rigCreasePattern(obRoot, lines, firstFold, side, collection)
+
+    return obRoot, len(lines)
+
+class ImportFoldFile(bpy.types.Operator, ImportHelper):
+    """Import a FOLD crease pattern and create a fold bone for every crease"""
+    bl_idname = "import_mesh.origami_fold"
+    bl_label = "Import FOLD Crease Pattern"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filename_ext = ".fold"
+    filter_glob: StringProperty(default="*.fold", options={'HIDDEN'})
+    foldSide: EnumProperty(
+        name="Fold Side",
+        description="Which side of each crease the fold bone moves",
+        items=[('LEFT', "Left", "Fold the left side of each crease"),
+            ('RIGHT', "Right", "Fold the right side of each crease"),
+            ('DUAL', "Dual", "Fold both sides of each crease (linked)")],
+        default='LEFT')
+    requireFlat: BoolProperty(
+        name="Require Flat Foldable",
+        description="Refuse patterns that break Maekawa's or Kawasaki's theorem at an interior vertex",
+        default=False)
+
+    def execute(self, context):
+        from . import foldCache, foldFormat
+
+        # Rigging needs object mode
+        if context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+        cacheStats = foldCache.snapshotStats()
+        try:
+            obRoot, foldCount = importFoldFile(self.filepath, context.collection, 1, self.foldSide,
+                self.requireFlat)
+        except (OSError, foldFormat.FoldFormatError) as err:
+            self.report({'ERROR'}, "Could not import FOLD file: %s" % err)
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, "Imported %d creases (%s)" % (foldCount, foldCache.describeStats(cacheStats)))
+
+        # Indicate operator completed
+        return {'FINISHED'}
+
+# Setup self registration
+classes = [ImportFoldFile]
+register, unregister = bpy.utils.register_classes_factory(classes)
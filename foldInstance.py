@@ -0,0 +1,107 @@
+# Import system and blender modules
+import random
+
+import bpy
+from bpy.props import FloatProperty, IntProperty
+from mathutils import Vector
+
+def retargetArmature(obj, oldArmature, newArmature):
+    # Copies still point their armature modifiers and fold constraints at the template's armature
+    for modifier in obj.modifiers:
+        if modifier.type == 'ARMATURE' and modifier.object == oldArmature:
+            modifier.object = newArmature
+    if obj.pose != None:
+        for poseBone in obj.pose.bones:
+            for constraint in poseBone.constraints:
+                if getattr(constraint, 'target', None) == oldArmature:
+                    constraint.target = newArmature
+
+def instanceCollection(armatureObj):
+    # Instances go in one child collection next to the template
+    parent = armatureObj.users_collection[0] if len(armatureObj.users_collection) > 0 else bpy.context.scene.collection
+    name = '%s Instances' % armatureObj.name
+    collection = bpy.data.collections.get(name)
+    if collection == None:
+        collection = bpy.data.collections.new(name)
+        parent.children.link(collection)
+    return collection
+
+def addTimingStrip(armatureObj, action, start):
+    # The shared fold action plays from an NLA strip, only its start frame differs per instance
+    animData = armatureObj.animation_data
+    if animData == None:
+        animData = armatureObj.animation_data_create()
+    animData.action = None
+    track = animData.nla_tracks.new()
+    track.name = 'Fold Timing'
+    return track.strips.new(action.name, start, action)
+
+def instanceFoldedModel(armatureObj, count, spacing = 2.0, columns = 10, frameOffset = 0, jitter = 0, seed = 0):
+    # Linked duplicates: every instance shares the armature data, the paper meshes and the fold action
+    papers = [child for child in armatureObj.children if child.type == 'MESH']
+    animData = armatureObj.animation_data
+    action = animData.action if animData != None else None
+    collection = instanceCollection(armatureObj)
+    rng = random.Random(seed)
+
+    instances = []
+    for i in range(1, count + 1):
+        row, column = divmod(i, columns)
+        newArmature = armatureObj.copy()
+        newArmature.location = armatureObj.location + Vector((column * spacing, -row * spacing, 0.0))
+        collection.objects.link(newArmature)
+        retargetArmature(newArmature, armatureObj, newArmature)
+
+        for paper in papers:
+            newPaper = paper.copy()
+            newPaper.parent = newArmature
+            collection.objects.link(newPaper)
+            retargetArmature(newPaper, armatureObj, newArmature)
+
+        # Per instance timing is the only thing that is not shared
+        if action != None:
+            start = int(action.frame_range[0]) + i * frameOffset + (rng.randint(0, jitter) if jitter > 0 else 0)
+            addTimingStrip(newArmature, action, start)
+        instances.append(newArmature)
+
+    return instances
+
+class InstanceFoldedModel(bpy.types.Operator):
+    """Place linked copies of a rigged paper model that share its mesh, armature and fold action"""
+    bl_idname = "object.instance_folded_model"
+    bl_label = "Instance Folded Model"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    count: IntProperty(name="Instances", description="Number of copies to add", default=10, min=1)
+    spacing: FloatProperty(name="Spacing", description="Distance between copies on the grid", default=2.0,
+        subtype='DISTANCE')
+    columns: IntProperty(name="Columns", description="Copies per grid row", default=10, min=1)
+    frameOffset: IntProperty(name="Frame Offset", description="Each copy starts its fold animation this many frames later",
+        default=0)
+    jitter: IntProperty(name="Random Offset", description="Up to this many extra frames of delay per copy", default=0, min=0)
+    seed: IntProperty(name="Seed", description="Seed for the random offsets", default=0)
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj is not None and (obj.type == 'ARMATURE' or (obj.parent is not None and obj.parent.type == 'ARMATURE'))
+
+    def execute(self, context):
+        from . import foldProfile
+
+        if context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        obj = context.object
+        armatureObj = obj if obj.type == 'ARMATURE' else obj.parent
+
+        with foldProfile.Profiler(self.bl_idname) as profiler:
+            instances = instanceFoldedModel(armatureObj, self.count, self.spacing, self.columns, self.frameOffset,
+                self.jitter, self.seed)
+        self.report({'INFO'}, "Added %d instances of %s (%s)" % (len(instances), armatureObj.name, profiler.summary()))
+
+        # Indicate operator completed
+        return {'FINISHED'}
+
+# Setup self registration
+classes = [InstanceFoldedModel]
+register, unregister = bpy.utils.register_classes_factory(classes)
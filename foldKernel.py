@@ -0,0 +1,686 @@
+# Fold geometry on plain NumPy arrays (no bpy or mathutils, safe for worker processes)
+import numpy as np
+
+# Tolerance for coordinates that count as equal
+eps = 1e-6
+
+# Fold sides as stored in fold records
+SIDE_LEFT = 0
+SIDE_RIGHT = 1
+SIDE_NAMES = ('LEFT', 'RIGHT')
+
+# How a fold bone is held to its hinge axis and follows its link target
+RIG_CONSTRAINTS = 0
+RIG_LOCKED = 1
+RIG_MODES = ('CONSTRAINTS', 'LOCKED')
+
+# Flat foldability failures at a crease vertex (bit flags)
+FLAT_ODD_DEGREE = 1
+FLAT_MAEKAWA = 2
+FLAT_KAWASAKI = 4
+FLAT_NAMES = ((FLAT_ODD_DEGREE, 'odd degree'), (FLAT_MAEKAWA, 'Maekawa'), (FLAT_KAWASAKI, 'Kawasaki'))
+
+class FoldSelectionError(Exception):
+    pass
+
+def worldTransform(local, matrix):
+    # Same as 'matrix_world @ co' on each vertex (the matrix as NumPy copies it from mathutils, w = 1)
+    matrix = np.asarray(matrix, dtype=np.float64)
+    return np.asarray(local) @ matrix[:3, :3].T + matrix[:3, 3]
+
+def worldPlane(v0, v1, vertNorm, matrix):
+    matrix = np.asarray(matrix, dtype=np.float64)
+    v0 = np.asarray(v0, dtype=np.float64)
+    v1 = np.asarray(v1, dtype=np.float64)
+
+    # Construct plane equation along fold and mesh vert normal in world coords
+    worldQ = worldTransform((v0 + v1) / 2.0, matrix)
+    worldFoldVec = worldTransform(v1, matrix) - worldTransform(v0, matrix)
+    worldFoldVec = worldFoldVec / np.linalg.norm(worldFoldVec)
+
+    # Normals skip the translation and use the inverse transpose, so they stay normal under non-uniform scale
+    worldVertNorm = np.asarray(vertNorm, dtype=np.float64) @ np.linalg.inv(matrix[:3, :3])
+
+    worldNorm = np.cross(worldFoldVec, worldVertNorm)
+    return worldQ, worldNorm / np.linalg.norm(worldNorm)
+
+def localPlanes(planePoints, normals, matrix):
+    # World fold planes back in object space, the exact inverse of worldPlane
+    matrix = np.asarray(matrix, dtype=np.float64)
+    localPoints = worldTransform(planePoints, np.linalg.inv(matrix))
+    localNormals = np.asarray(normals, dtype=np.float64).reshape(-1, 3) @ matrix[:3, :3]
+    return localPoints, localNormals / np.linalg.norm(localNormals, axis=1, keepdims=True)
+
+def orientPlane(worldNorm):
+    # Ensure the plane normal aligns roughly with -X or +Y
+    facing = -worldNorm[0]
+    if abs(facing) < 1e-2: # Too close to perpendicular, use Y instead
+        facing = worldNorm[1]
+
+    # Flip plane normal if required
+    return -worldNorm if facing < 0 else worldNorm
+
+def foldPlane(v0, v1, vertNorm, matrix):
+    worldQ, worldNorm = worldPlane(v0, v1, vertNorm, matrix)
+    return worldQ, orientPlane(worldNorm)
+
+def signedDistances(coords, q, n):
+    return coords @ n - n @ q
+
+def classify(coords, q, n, eps = 1e-4):
+    signedDist = signedDistances(coords, q, n)
+
+    # Group based on signed distance (anything not clearly on a side is planer)
+    leftMask = signedDist > eps
+    rightMask = signedDist < -eps
+    planer = np.flatnonzero(~(leftMask | rightMask))
+    return planer, np.flatnonzero(leftMask), np.flatnonzero(rightMask)
+
+def walkEdgeChain(edgeVerts):
+    # Count how many selected edges touch each vertex
+    chainVerts, localEdges = np.unique(edgeVerts, return_inverse=True)
+    localEdges = localEdges.reshape(-1, 2)
+    degree = np.bincount(localEdges.ravel(), minlength=len(chainVerts))
+
+    # A simple open chain has exactly two ends and no forks
+    if np.any(degree > 2):
+        raise FoldSelectionError("Selected edges branch, select a single fold line")
+    ends = np.flatnonzero(degree == 1)
+    if len(ends) == 0:
+        raise FoldSelectionError("Selected edges form a closed loop, select a single fold line")
+    if len(ends) != 2:
+        raise FoldSelectionError("Selected edges are not connected, select a single fold line")
+
+    # Each vertex has at most two neighbors, so store them in two slots
+    neighbors = np.full((len(chainVerts), 2), -1, dtype=np.int64)
+    for a, b in localEdges.tolist():
+        neighbors[a, 0 if neighbors[a, 0] < 0 else 1] = b
+        neighbors[b, 0 if neighbors[b, 0] < 0 else 1] = a
+
+    # Walk from one end to the other
+    previous, current = -1, ends[0]
+    visited = 1
+    while True:
+        nextVert = neighbors[current, 0] if neighbors[current, 0] != previous else neighbors[current, 1]
+        if nextVert < 0:
+            break
+        previous, current = current, nextVert
+        visited = visited + 1
+
+    # Anything not reached is a separate loop
+    if visited != len(chainVerts):
+        raise FoldSelectionError("Selected edges are not connected, select a single fold line")
+
+    return chainVerts[ends[0]], chainVerts[current], chainVerts
+
+def checkCollinear(coords, chainVerts, start, end, eps = 1e-4):
+    # Every vertex along the chain must lie on the line between the endpoints
+    coords = np.asarray(coords, dtype=np.float64)
+    lineDir = coords[end] - coords[start]
+    lineDir = lineDir / np.linalg.norm(lineDir)
+    offsets = coords[chainVerts] - coords[start]
+    distances = np.linalg.norm(offsets - np.outer(offsets @ lineDir, lineDir), axis=1)
+    if np.any(distances > eps):
+        raise FoldSelectionError("Selected edges are not collinear, select a single straight fold line")
+
+def labelRegions(faceCount, pairs):
+    # Vectorized union-find: hook larger roots onto smaller ones, then pointer jump
+    parent = np.arange(faceCount)
+    a, b = pairs[:, 0], pairs[:, 1]
+    while True:
+        rootA, rootB = parent[a], parent[b]
+        if np.array_equal(rootA, rootB):
+            break
+        np.minimum.at(parent, np.maximum(rootA, rootB), np.minimum(rootA, rootB))
+        while True:
+            grandParent = parent[parent]
+            if np.array_equal(grandParent, parent):
+                break
+            parent = grandParent
+
+    # Number regions 0..n-1
+    _, labels = np.unique(parent, return_inverse=True)
+    return labels.reshape(-1)
+
+def faceRegions(loopVerts, loopTotal, loopEdges, edgeCount, vertCount, seams):
+    loopFaces = np.repeat(np.arange(len(loopTotal)), loopTotal)
+
+    # Faces around each edge, as a CSR list sorted by edge
+    order = np.argsort(loopEdges, kind='stable')
+    edgeSorted = loopEdges[order]
+    faceSorted = loopFaces[order]
+    edgeStart = np.searchsorted(edgeSorted, np.arange(edgeCount + 1))
+
+    # Neighbouring faces are joined unless the edge between them is a crease
+    shared = (edgeSorted[1:] == edgeSorted[:-1]) & ~seams[edgeSorted[1:]]
+    pairs = np.stack([faceSorted[:-1][shared], faceSorted[1:][shared]], axis=1)
+    faceRegion = labelRegions(len(loopTotal), pairs)
+    regionVerts, regionStart = regionVertices(faceRegion, loopFaces, loopVerts, vertCount)
+
+    return {
+        'loopVerts': loopVerts,
+        'loopStart': np.concatenate([[0], np.cumsum(loopTotal)]),
+        'edgeFaces': faceSorted,
+        'edgeStart': edgeStart,
+        'faceRegion': faceRegion,
+        'regionVerts': regionVerts,
+        'regionStart': regionStart
+    }
+
+def regionVertices(faceRegion, loopFaces, loopVerts, vertCount):
+    # Distinct vertices of every region, as a CSR list sorted by region
+    regionVertKeys = np.unique(faceRegion[loopFaces].astype(np.int64) * vertCount + loopVerts)
+    regionOf = regionVertKeys // vertCount
+    regionStart = np.searchsorted(regionOf, np.arange(faceRegion.max() + 2 if len(faceRegion) > 0 else 1))
+    return regionVertKeys % vertCount, regionStart
+
+def splitRegions(regions, seams, newCreases, vertCount):
+    # A new crease can only cut the regions it runs through, so only their faces are relabelled
+    edgeStart = regions['edgeStart']
+    edgeFaces = regions['edgeFaces']
+    edgeSorted = np.repeat(np.arange(len(edgeStart) - 1), np.diff(edgeStart))
+    faceRegion = regions['faceRegion']
+    cut = np.zeros(faceRegion.max() + 1 if len(faceRegion) > 0 else 0, dtype=bool)
+    cut[faceRegion[edgeFaces[np.isin(edgeSorted, newCreases)]]] = True
+    cutFaces = np.flatnonzero(cut[faceRegion])
+    if len(cutFaces) == 0:
+        return regions
+
+    # Union-find over the cut faces alone, joined across edges that are still not creases
+    localFace = np.full(len(faceRegion), -1, dtype=np.int64)
+    localFace[cutFaces] = np.arange(len(cutFaces))
+    shared = (edgeSorted[1:] == edgeSorted[:-1]) & ~seams[edgeSorted[1:]] & (localFace[edgeFaces[1:]] >= 0)
+    pairs = np.stack([localFace[edgeFaces[:-1][shared]], localFace[edgeFaces[1:][shared]]], axis=1)
+    pieces = labelRegions(len(cutFaces), pairs)
+
+    # New pieces are numbered after the untouched regions, then everything is packed to 0..n-1 again
+    faceRegion = faceRegion.copy()
+    faceRegion[cutFaces] = len(cut) + pieces
+    _, faceRegion = np.unique(faceRegion, return_inverse=True)
+    faceRegion = faceRegion.reshape(-1)
+
+    loopStart = regions['loopStart']
+    loopFaces = np.repeat(np.arange(len(loopStart) - 1), np.diff(loopStart))
+    regionVerts, regionStart = regionVertices(faceRegion, loopFaces, regions['loopVerts'], vertCount)
+    return dict(regions, faceRegion=faceRegion, regionVerts=regionVerts, regionStart=regionStart)
+
+def flapPartition(regions, worldCoords, creaseEdges, q, n, eps = 1e-4):
+    planeOffset = n @ q
+
+    # Faces touching the crease, and which side of it their centers are on
+    edgeStart = regions['edgeStart']
+    faces = np.concatenate([regions['edgeFaces'][edgeStart[e]:edgeStart[e + 1]] for e in creaseEdges])
+    loopStart = regions['loopStart']
+    centerDist = np.array([
+        worldCoords[regions['loopVerts'][loopStart[f]:loopStart[f + 1]]].mean(axis=0) @ n
+        for f in faces]) - planeOffset
+    leftRegions = set(regions['faceRegion'][faces[centerDist > eps]].tolist())
+    rightRegions = set(regions['faceRegion'][faces[centerDist < -eps]].tolist())
+
+    # A region on both sides means the crease does not separate a flap there
+    leftRegions, rightRegions = leftRegions - rightRegions, rightRegions - leftRegions
+    if len(leftRegions) == 0 and len(rightRegions) == 0:
+        raise FoldSelectionError("Crease does not bound a flap, mark the surrounding creases as seams")
+
+    # Only the vertices of the flap regions are classified
+    regionVerts = regions['regionVerts']
+    regionStart = regions['regionStart']
+    def flapVerts(regionIds):
+        if len(regionIds) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate([regionVerts[regionStart[r]:regionStart[r + 1]] for r in regionIds]))
+
+    leftVerts = flapVerts(leftRegions)
+    rightVerts = flapVerts(rightRegions)
+    leftDist = worldCoords[leftVerts] @ n - planeOffset
+    rightDist = worldCoords[rightVerts] @ n - planeOffset
+
+    # Verts on the crease itself stay put, everything else in the flap moves
+    planer = np.union1d(leftVerts[np.abs(leftDist) <= eps], rightVerts[np.abs(rightDist) <= eps])
+    return planer, leftVerts[np.abs(leftDist) > eps], rightVerts[np.abs(rightDist) > eps]
+
+def rotationMatrix(axis, angle):
+    # Rodrigues rotation about a unit axis (column vectors)
+    axis = np.asarray(axis, dtype=np.float64)
+    axis = axis / np.linalg.norm(axis)
+    x, y, z = axis
+    cross = np.array([[0.0, -z, y], [z, 0.0, -x], [-y, x, 0.0]])
+    return np.eye(3) + np.sin(angle) * cross + (1.0 - np.cos(angle)) * (cross @ cross)
+
+def rotateAboutAxis(relative, pivot, axis, angle, out = None):
+    # Verts given relative to a pivot on the axis (gathered once), turned and moved back
+    rotation = rotationMatrix(axis, angle).astype(relative.dtype)
+    out = np.matmul(relative, rotation.T, out=out)
+    out += np.asarray(pivot, dtype=relative.dtype)
+    return out
+
+def groupByBone(boneOf, boneCount):
+    # Vertex indices sorted by the one bone moving them rigidly (-1: none), as a CSR list
+    order = np.argsort(boneOf, kind='stable')
+    starts = np.searchsorted(boneOf[order], np.arange(-1, boneCount + 1))
+    return order[starts[1]:], starts[1:] - starts[1]
+
+def rigidDeform(coords, order, starts, transforms, out):
+    # Each fold's partition turns rigidly with its bone (transforms are 4x4, column vectors)
+    out[:] = coords
+    for bone in range(len(transforms)):
+        verts = order[starts[bone]:starts[bone + 1]]
+        if len(verts) > 0:
+            out[verts] = coords[verts] @ transforms[bone, :3, :3].T + transforms[bone, :3, 3]
+    return out
+
+def blendDeform(coords, vertIdx, boneIdx, weights, transforms, out):
+    # Verts weighted to several bones (e.g. graded bevels), normalized like the armature modifier
+    if len(vertIdx) == 0:
+        return out
+    verts, local = np.unique(vertIdx, return_inverse=True)
+    matrices = transforms[boneIdx]
+    moved = np.einsum('eij,ej->ei', matrices[:, :3, :3], coords[vertIdx]) + matrices[:, :3, 3]
+    total = np.bincount(local, weights, minlength=len(verts))
+    blended = np.zeros((len(verts), 3))
+    np.add.at(blended, local, moved * weights[:, None])
+    out[verts] = blended / total[:, None]
+    return out
+
+def faceFlaps(loopVerts, loopStart, boneOf, depth):
+    # Flap of each face: the deepest bone among its vertices (hinge verts belong to the parent, -1: static)
+    boneCount = len(depth)
+    vertBone = boneOf[loopVerts]
+    rank = np.where(vertBone < 0, 0, (np.asarray(depth)[vertBone] + 1) * (boneCount + 1) + vertBone + 1)
+    return np.maximum.reduceat(rank, loopStart) % (boneCount + 1) - 1
+
+def flapBounds(coords, loopVerts, loopStart, flapOf, flapCount):
+    # Rest bounding box of the faces in every flap (empty flaps get an inverted box)
+    loopFlap = np.repeat(flapOf, np.diff(np.append(loopStart, len(loopVerts))))
+    points = coords[loopVerts]
+    boxMin = np.full((flapCount, 3), np.inf)
+    boxMax = np.full((flapCount, 3), -np.inf)
+    np.minimum.at(boxMin, loopFlap, points)
+    np.maximum.at(boxMax, loopFlap, points)
+    return boxMin, boxMax
+
+def transformedBounds(boxMin, boxMax, transforms):
+    # Axis aligned boxes around rest boxes moved by one 4x4 transform each
+    pick = np.array([[i & 1, (i >> 1) & 1, (i >> 2) & 1] for i in range(8)], dtype=bool)
+    corners = np.where(pick[None], boxMax[:, None], boxMin[:, None])
+    moved = np.einsum('fij,fcj->fci', transforms[:, :3, :3], corners) + transforms[:, None, :3, 3]
+    return moved.min(axis=1), moved.max(axis=1)
+
+def overlappingPairs(boxMin, boxMax, margin = 0.0):
+    # Index pairs (i < j) of boxes that touch within margin
+    apart = (boxMin[:, None] > boxMax[None] + margin) | (boxMax[:, None] < boxMin[None] - margin)
+    touching = ~apart.any(axis=2)
+    return np.argwhere(np.triu(touching, 1))
+
+def segmentsNearBox(starts, ends, boxMin, boxMax, margin = 0.0):
+    # Segments whose own bounding box touches the given box
+    low = np.minimum(starts, ends)
+    high = np.maximum(starts, ends)
+    return np.flatnonzero(np.all(high >= boxMin - margin, axis=1) & np.all(low <= boxMax + margin, axis=1))
+
+def frameRanges(frames, hits):
+    # Runs of consecutive sampled frames with a hit, as (first, last) frame pairs
+    hits = np.concatenate([[False], np.asarray(hits, dtype=bool), [False]])
+    edges = np.flatnonzero(hits[1:] != hits[:-1])
+    return [(frames[first], frames[last - 1]) for first, last in zip(edges[::2], edges[1::2])]
+
+def boundaryVertices(loopVerts, loopStart, vertCount):
+    # Vertices on face sides used by one face only (the outline of the paper and its holes)
+    loopEnd = np.append(loopStart[1:], len(loopVerts))
+    nextLoop = np.arange(1, len(loopVerts) + 1)
+    nextLoop[loopEnd - 1] = loopStart
+    sides = np.sort(np.stack([loopVerts, loopVerts[nextLoop]], axis=1), axis=1)
+    keys, counts = np.unique(sides[:, 0] * vertCount + sides[:, 1], return_counts=True)
+    single = keys[counts == 1]
+    onBoundary = np.zeros(vertCount, dtype=bool)
+    onBoundary[single // vertCount] = True
+    onBoundary[single % vertCount] = True
+    return onBoundary
+
+def planarCoords(coords):
+    # Flat paper in its own plane as 2D points, however the sheet is oriented
+    centered = coords - coords.mean(axis=0)
+    _, axes = np.linalg.eigh(centered.T @ centered)
+    return centered @ axes[:, 1:]
+
+def planarFaces(coords2d, edges):
+    # Dangling creases (ending inside the sheet) bound no face, they are left out and stay loose edges
+    keep = np.ones(len(edges), dtype=bool)
+    while True:
+        degree = np.bincount(edges[keep].ravel(), minlength=len(coords2d))
+        spur = keep & ((degree[edges[:, 0]] == 1) | (degree[edges[:, 1]] == 1))
+        if not spur.any():
+            break
+        keep = keep & ~spur
+    edges = edges[keep]
+
+    # Faces of a flat edge graph: walk each half edge, turning onto the next edge clockwise at every vertex
+    halfEdges = np.stack([edges, edges[:, ::-1]], axis=1).reshape(-1, 2)
+    direction = coords2d[halfEdges[:, 1]] - coords2d[halfEdges[:, 0]]
+    angle = np.arctan2(direction[:, 1], direction[:, 0])
+    order = np.lexsort((angle, halfEdges[:, 0]))
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    starts = np.searchsorted(halfEdges[order, 0], np.arange(len(coords2d) + 1))
+
+    # Half edge 2i + 1 is the twin of 2i, the walk leaves its end just before the twin
+    twin = np.arange(len(halfEdges)) ^ 1
+    vert = halfEdges[twin, 0]
+    degree = starts[vert + 1] - starts[vert]
+    nextEdge = order[starts[vert] + (rank[twin] - starts[vert] - 1) % degree]
+
+    faces = []
+    visited = np.zeros(len(halfEdges), dtype=bool)
+    for first in range(len(halfEdges)):
+        edge = first
+        face = []
+        while not visited[edge]:
+            visited[edge] = True
+            face.append(edge)
+            edge = nextEdge[edge]
+        if len(face) > 2:
+            faces.append(halfEdges[face, 0])
+
+    # Counter-clockwise walks are faces, clockwise ones are the outlines around them
+    if len(faces) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    sizes = np.array([len(face) for face in faces], dtype=np.int64)
+    loopVerts = np.concatenate(faces)
+    nextLoop = np.arange(1, len(loopVerts) + 1)
+    nextLoop[np.cumsum(sizes) - 1] = np.cumsum(sizes) - sizes
+    a, b = coords2d[loopVerts], coords2d[loopVerts[nextLoop]]
+    area = np.add.reduceat(a[:, 0] * b[:, 1] - a[:, 1] * b[:, 0], np.cumsum(sizes) - sizes)
+    keep = np.repeat(area > 0, sizes)
+    return loopVerts[keep], sizes[area > 0]
+
+def flatFoldCheck(coords2d, edges, mountain, valley, interior, tol = 1e-4):
+    # Maekawa (|M - V| = 2) and Kawasaki (alternate sector angles sum to pi) at every interior crease vertex
+    ends = np.concatenate([edges, edges[:, ::-1]])
+    keep = interior[ends[:, 0]]
+    ends = ends[keep]
+    isMountain = np.concatenate([mountain, mountain])[keep]
+    isValley = np.concatenate([valley, valley])[keep]
+    if len(ends) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), empty, empty
+
+    # Creases around each vertex in angular order
+    direction = coords2d[ends[:, 1]] - coords2d[ends[:, 0]]
+    angle = np.arctan2(direction[:, 1], direction[:, 0])
+    order = np.lexsort((angle, ends[:, 0]))
+    angle = angle[order]
+    verts, starts, degree = np.unique(ends[order, 0], return_index=True, return_counts=True)
+
+    # Sector after each crease, the last one wraps around to the first
+    sector = np.empty(len(angle))
+    sector[:-1] = np.diff(angle)
+    last = starts + degree - 1
+    sector[last] = 2 * np.pi - (angle[last] - angle[starts])
+    position = np.arange(len(angle)) - np.repeat(starts, degree)
+    kawasaki = np.add.reduceat(np.where(position % 2 == 0, sector, -sector), starts)
+
+    # Maekawa only applies where every crease has a known mountain/valley assignment
+    mountains = np.add.reduceat(isMountain[order].astype(np.int64), starts)
+    valleys = np.add.reduceat(isValley[order].astype(np.int64), starts)
+    assigned = mountains + valleys == degree
+
+    odd = degree % 2 == 1
+    flags = np.where(odd, FLAT_ODD_DEGREE, 0)
+    flags |= np.where(~odd & assigned & (np.abs(mountains - valleys) != 2), FLAT_MAEKAWA, 0)
+    flags |= np.where(~odd & (np.abs(kawasaki) > tol), FLAT_KAWASAKI, 0)
+    return verts, flags, kawasaki, mountains, valleys
+
+def bevelBands(coords, planePoints, normals, signs, width):
+    # Nearest fold plane of each bevel vertex and how far across its band it lies (0: still side, 1: moving side)
+    if len(planePoints) == 0:
+        return np.full(len(coords), -1, dtype=np.int64), np.zeros(len(coords))
+    dist = coords @ normals.T - np.sum(planePoints * normals, axis=1)
+    fold = np.argmin(np.abs(dist), axis=1)
+    nearest = dist[np.arange(len(coords)), fold]
+    fold[np.abs(nearest) > width * 1.01 + eps] = -1
+    across = np.clip(signs[fold] * nearest / (2.0 * width) + 0.5, 0.0, 1.0)
+    return fold, across
+
+# Set bits in every byte value, for popcounts without np.bitwise_count (NumPy < 2.0)
+popcountTable = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def packedWords(bits):
+    # Packed uint8 bitsets as uint64 words (zero padded), so AND works 64 verts at a time
+    bits = np.asarray(bits, dtype=np.uint8).reshape(len(bits), -1)
+    padded = np.zeros((len(bits), (bits.shape[1] + 7) // 8 * 8), dtype=np.uint8)
+    padded[:, :bits.shape[1]] = bits
+    return padded.view(np.uint64)
+
+def popcount(words):
+    # Set bits per row
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return popcountTable[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+def overlapCounts(words, sizes):
+    # Intersection sizes of every pair (symmetric), only over the span of words where fold i has verts
+    count = len(words)
+    overlap = np.diag(sizes)
+    for i in range(count - 1):
+        used = np.flatnonzero(words[i])
+        if len(used) > 0:
+            lo, hi = used[0], used[-1] + 1
+            shared = popcount(words[i + 1:, lo:hi] & words[i, lo:hi])
+            overlap[i, i + 1:] = shared
+            overlap[i + 1:, i] = shared
+    return overlap
+
+def nestedParents(words, sizes, contains):
+    # The parent is the smallest fold containing this one (the latest one among equal sets)
+    count = len(words)
+    index = np.arange(count)
+    contains = contains & ((sizes[:, None] > sizes[None, :]) |
+        ((sizes[:, None] == sizes[None, :]) & (index[:, None] < index[None, :])))
+    score = np.where(contains, sizes[:, None] * (count + 1) - index[:, None], np.iinfo(np.int64).max)
+    return np.where(contains.any(axis=0), np.argmin(score, axis=0), -1), contains
+
+def isLaminar(words, sizes, parents):
+    # Every fold lies inside its parent and folds sharing a parent are disjoint, which
+    # together rule out any partly overlapping pair (only one AND per fold and parent)
+    for j in np.flatnonzero(parents >= 0):
+        if np.any(words[j] & ~words[parents[j]]):
+            return False
+    for parent in np.unique(parents):
+        siblings = np.flatnonzero(parents == parent)
+        if len(siblings) > 1 and popcount(np.bitwise_or.reduce(words[siblings], axis=0)) != sizes[siblings].sum():
+            return False
+    return True
+
+def containmentParents(bits):
+    # Moving vertex sets of several folds, as packed bitsets (one row per fold)
+    words = packedWords(bits)
+    count = len(words)
+    sizes = popcount(words)
+    index = np.arange(count)
+
+    # Fast path: when no folds cross, the folds containing any one vert of j are exactly
+    # the folds containing j, so test membership of one representative vert per fold
+    byteWords = words.view(np.uint8)
+    firstByte = np.argmax(byteWords != 0, axis=1)
+    firstBit = np.argmax(np.unpackbits(byteWords[index, firstByte][:, None], axis=1), axis=1)
+    reps = firstByte * 8 + firstBit
+    member = (byteWords[:, reps // 8] >> (7 - reps % 8)[None, :]) & 1
+    contains = (member == 1) & (sizes[None, :] > 0)
+    parents, contains = nestedParents(words, sizes, contains)
+
+    # Otherwise fall back to all pairwise intersections to find the crossing folds
+    if isLaminar(words, sizes, parents):
+        conflicts = np.empty((0, 2), dtype=np.int64)
+    else:
+        overlap = overlapCounts(words, sizes)
+        parents, contains = nestedParents(words, sizes, (overlap == sizes[None, :]) & (sizes[None, :] > 0))
+
+        # Partly overlapping folds cannot be nested, they would tear the paper
+        crossing = (overlap > 0) & ~contains & ~contains.T & (index[:, None] < index[None, :])
+        conflicts = np.argwhere(crossing)
+
+    # Children before parents: vertex groups only take verts no earlier fold claimed
+    order = np.lexsort((-index, sizes))
+    return parents, conflicts, order
+
+class FoldRecord:
+    """View of one fold in a FoldTable"""
+    __slots__ = ('index', 'number', 'planePoint', 'normal', 'side', 'boneName', 'parent', 'linkTo', 'mode')
+
+    def __init__(self, table, index):
+        self.index = index
+        self.number = int(table.numbers[index])
+        self.planePoint = table.planePoints[index]
+        self.normal = table.normals[index]
+        self.side = int(table.sides[index])
+        self.boneName = table.boneNames[index]
+        self.parent = int(table.parents[index])
+        self.linkTo = int(table.links[index])
+        self.mode = int(table.modes[index])
+
+class FoldTable:
+    """Fold graph: object space planes and sides in growable arrays, parent and link edges indexed both ways"""
+    __slots__ = ('count', 'numbers', 'planePoints', 'normals', 'sides', 'parents', 'links', 'modes',
+        'boneNames', 'boneIndex', 'foldIndex', 'children', 'linkedFrom')
+
+    def __init__(self, capacity = 16):
+        self.count = 0
+        self.numbers = np.empty(capacity, dtype=np.int32)
+        self.planePoints = np.empty((capacity, 3))
+        self.normals = np.empty((capacity, 3))
+        self.sides = np.empty(capacity, dtype=np.int8)
+        self.parents = np.empty(capacity, dtype=np.int32)
+        self.links = np.empty(capacity, dtype=np.int32)
+        self.modes = np.empty(capacity, dtype=np.int8)
+        self.boneNames = []
+
+        # Lookups by bone name and by (fold number, side), and the reverse edges
+        self.boneIndex = {}
+        self.foldIndex = {}
+        self.children = {}
+        self.linkedFrom = {}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index = index + self.count
+        if index < 0 or index >= self.count:
+            raise IndexError(index)
+        return FoldRecord(self, index)
+
+    def grow(self):
+        # Double the capacity of every array
+        for name in ('numbers', 'planePoints', 'normals', 'sides', 'parents', 'links', 'modes'):
+            old = getattr(self, name)
+            new = np.empty((len(old) * 2,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+
+    def append(self, planePoint, normal, side, boneName, linkTo = -1, number = None, mode = RIG_CONSTRAINTS):
+        if self.count == len(self.sides):
+            self.grow()
+        index = self.count
+        if number == None:
+            number = self.nextNumber()
+        self.numbers[index] = number
+        self.planePoints[index] = planePoint
+        self.normals[index] = normal
+        self.sides[index] = side
+        self.parents[index] = -1
+        self.links[index] = linkTo
+        self.modes[index] = mode
+        self.boneNames.append(boneName)
+        self.boneIndex[boneName] = index
+        self.foldIndex[(int(number), int(side))] = index
+        if linkTo >= 0:
+            self.linkedFrom.setdefault(linkTo, []).append(index)
+        self.count = index + 1
+        return index
+
+    def nextNumber(self):
+        return int(self.numbers[:self.count].max()) + 1 if self.count > 0 else 1
+
+    def find(self, boneName):
+        return self.boneIndex.get(boneName, -1)
+
+    def findFold(self, number, side):
+        return self.foldIndex.get((number, side), -1)
+
+    def subtree(self, index):
+        # The fold and everything parented below it
+        found = [index]
+        for current in found:
+            found.extend(self.children.get(current, ()))
+        return found
+
+    def setParent(self, child, parent):
+        # Only the old and new parent's child lists change
+        oldParent = int(self.parents[child])
+        if oldParent == parent:
+            return
+        if parent >= 0 and parent in self.subtree(child):
+            raise ValueError("%s cannot be parented to its own descendant" % self.boneNames[child])
+        if oldParent >= 0:
+            self.children[oldParent].remove(child)
+        if parent >= 0:
+            self.children.setdefault(parent, []).append(child)
+        self.parents[child] = parent
+
+    def setLink(self, index, linkTo):
+        oldLink = int(self.links[index])
+        if oldLink >= 0:
+            self.linkedFrom[oldLink].remove(index)
+        if linkTo >= 0:
+            self.linkedFrom.setdefault(linkTo, []).append(index)
+        self.links[index] = linkTo
+
+    def roots(self):
+        # Folds not yet parented to another fold, in creation order
+        return np.flatnonzero(self.parents[:self.count] == -1)
+
+    def topologicalOrder(self):
+        # Parents and link targets come before the folds that depend on them
+        pending = np.zeros(self.count, dtype=np.int32)
+        pending += self.parents[:self.count] >= 0
+        pending += self.links[:self.count] >= 0
+        order = np.flatnonzero(pending == 0).tolist()
+        for index in order:
+            for dependent in self.children.get(index, []) + self.linkedFrom.get(index, []):
+                pending[dependent] = pending[dependent] - 1
+                if pending[dependent] == 0:
+                    order.append(dependent)
+        if len(order) != self.count:
+            raise ValueError("Fold parents and links form a cycle")
+        return np.array(order, dtype=np.int64)
+
+    def toProps(self):
+        # Plain values, suitable for storing as ID properties (those hold no string lists, so the bone
+        # names are stored joined, with their lengths)
+        count = self.count
+        return {
+            'boneNames': ''.join(self.boneNames),
+            'boneLengths': [len(boneName) for boneName in self.boneNames],
+            'numbers': self.numbers[:count].tolist(),
+            'sides': self.sides[:count].tolist(),
+            'parents': self.parents[:count].tolist(),
+            'links': self.links[:count].tolist(),
+            'modes': self.modes[:count].tolist(),
+            'planes': np.concatenate([self.planePoints[:count], self.normals[:count]], axis=1).ravel().tolist()
+        }
+
+    @classmethod
+    def fromProps(cls, props):
+        ends = np.cumsum(props['boneLengths'], dtype=np.int64).tolist()
+        bones = [props['boneNames'][start:end] for start, end in zip([0] + ends[:-1], ends)]
+        planes = np.asarray(props['planes'], dtype=np.float64).reshape(-1, 6)
+        modes = props.get('modes', [RIG_CONSTRAINTS] * len(bones))
+        table = cls(max(16, len(bones)))
+        for index, boneName in enumerate(bones):
+            table.append(planes[index, :3], planes[index, 3:], props['sides'][index], boneName,
+                props['links'][index], props['numbers'][index], modes[index])
+        for index, parent in enumerate(props['parents']):
+            if parent >= 0:
+                table.setParent(index, parent)
+        return table
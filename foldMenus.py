@@ -17,6 +17,21 @@ class VIEW3D_MT_edit_origami_fold_menu(bpy.types.Menu):
         layout.operator("object.create_fold_dual")
         layout.operator("object.create_parent_fold_dual")
         layout.operator("object.create_inverse_parent_fold_dual")
+        layout.separator()
+        layout.operator("object.create_fold_left", text="Create Left Flap Fold").flapOnly = True
+        layout.operator("object.create_fold_right", text="Create Right Flap Fold").flapOnly = True
+        layout.operator("object.create_fold_dual", text="Create Dual Flap Fold").flapOnly = True
+        layout.separator()
+        layout.operator("object.check_flat_foldable")
+        layout.operator("object.preview_fold")
+        layout.operator("object.create_folds_auto_parent")
+        layout.operator("object.sync_linked_folds")
+        layout.operator("object.key_fold_schedule")
+        layout.operator("object.bevel_fold_creases")
+        layout.separator()
+        layout.operator("object.bake_fold_rig")
+        layout.operator("object.check_fold_collisions")
+        layout.operator("object.instance_folded_model")
 
 # Auto generate register and unregister methods
 classes = [VIEW3D_MT_edit_origami_fold_menu]
@@ -1,122 +1,290 @@
 # Import system and blender modules
-import bpy
+import math
 
-# Import our own custom modules
-from . import foldUtils
+import bpy
 
-class CreateFoldMixin:
+# Our own modules (and NumPy) are imported when an operator runs, keeping add-on startup fast
+
+class FoldProfileMixin:
+    """Stage timing and profiling for fold operators"""
+
+    def profileFold(self, context, build, *args):
+        from . import foldPrefs, foldProfile
+        from .foldUtils import FoldTransaction
+
+        # Time every stage, optionally under cProfile for this one run
+        prefs = foldPrefs.getPreferences(context)
+        profiler = foldProfile.Profiler(self.bl_idname)
+        with profiler:
+            result = self.runTransaction(FoldTransaction(), prefs, build, args)
+
+        if prefs != None and prefs.reportTimings:
+            self.report({'INFO'}, profiler.summary())
+        if prefs != None and prefs.timingLog:
+            try:
+                profiler.writeLog(bpy.path.abspath(prefs.timingLog), finished=result,
+                    object=context.active_object.name if context.active_object != None else None)
+            except OSError as err:
+                self.report({'WARNING'}, "Could not write timing log: %s" % err)
+
+        return result
+
+    def runTransaction(self, transaction, prefs, build, args):
+        # A failed fold undoes whatever it already changed, so the operator leaves no partial rig
+        from . import foldProfile
+
+        try:
+            with transaction:
+                if prefs != None and prefs.profileNext:
+                    prefs.profileNext = False
+                    output = bpy.path.abspath(prefs.profileOutput) if prefs.profileOutput else None
+                    result, stats = foldProfile.runCProfile(build, args, output, prefs.profileLines)
+                    if stats != None:
+                        print(stats)
+                    self.report({'INFO'}, "Profile saved to %s" % output if output else "Profile printed to the console")
+                else:
+                    result = build(*args)
+                if not result:
+                    transaction.rollback()
+        except RuntimeError as err:
+            self.report({'ERROR'}, "Fold failed and was rolled back: %s" % err)
+            return False
+
+        return result
+
+class CreateFoldMixin(FoldProfileMixin):
     """Create Fold Mixin Base"""
 
-    # Static class level variable
-    foldBones = []
-    foldCount = 0
+    flapOnly: bpy.props.BoolProperty(
+        name="Limit to Flap",
+        description="Only fold the flap bounded by other creases (seams) instead of the whole side",
+        default=False)
+
+    rigMode: bpy.props.EnumProperty(
+        name="Rig Mode",
+        description="How fold bones are held to their crease and follow linked folds",
+        items=[('CONSTRAINTS', "Constraints", "Limit Rotation and Copy Rotation constraints (evaluated every frame)"),
+            ('LOCKED', "Rotation Locks", "Rotation locks only, linked folds copy keys with 'Sync Linked Folds' (faster playback)")],
+        default='CONSTRAINTS')
+
+    armatureName: bpy.props.StringProperty(
+        name="Armature",
+        description="Armature that gets the bones of every selected paper (empty: the one they are rigged to, or a new one)",
+        default="")
+
+    collectionName: bpy.props.StringProperty(
+        name="Collection",
+        description="Collection a new armature is added to (empty: the collection of the active paper)",
+        default="")
+
+    def draw(self, context):
+        # Armature and collection are picked from the ones in the file
+        layout = self.layout
+        if hasattr(self, 'foldSide'):
+            layout.prop(self, 'foldSide')
+        layout.prop(self, 'flapOnly')
+        layout.prop(self, 'rigMode')
+        layout.prop_search(self, 'armatureName', bpy.data, 'objects')
+        layout.prop_search(self, 'collectionName', bpy.data, 'collections')
 
     def getSelectedVerts(self, context):
-        # Switch to object mode to gather selected vertices
-        bpy.ops.object.mode_set(mode='OBJECT')
+        from . import foldProfile, foldUtils
+
+        # Switch to object mode to gather selected vertices (back to the old mode if the fold fails)
+        foldUtils.recordUndo(foldUtils.restoreMode, context.active_object, context.active_object.mode)
+        with foldProfile.span('mode toggles'):
+            bpy.ops.object.mode_set(mode='OBJECT')
         obRoot = context.active_object
         obMesh = context.active_object.data
 
-        # Initialize selected vertices list
-        selectedVerts = []
-
         # Is this a mesh?
-        if obRoot.type == 'MESH':
-            # Retrieve and verify selected vertices
-            selectedVerts = foldUtils.getSelectedVertices(obMesh)
+        if obRoot.type != 'MESH':
+            raise foldUtils.FoldSelectionError("Active object must be a mesh")
 
-        # Return back the selected verts
-        return selectedVerts
+        # Retrieve and verify selected vertices
+        return foldUtils.getSelectedVertices(obMesh)
 
-    def createSingleFold(self, context, dir, linked, asParent = False):
-        # Advance count if needed
-        if not linked:
-            CreateFoldMixin.foldCount = CreateFoldMixin.foldCount + 1
-        
-        # Validate selection
-        selectedVerts = self.getSelectedVerts(context)
+    def getSelectedPapers(self, context):
+        from . import foldProfile, foldUtils
+
+        # Every mesh in edit mode (or every selected mesh in object mode), the active one first
         obRoot = context.active_object
-        if len(selectedVerts) != 2:
-            print("Must select 2+ vertices or 2+ edges in a mesh first")
+        if obRoot.type != 'MESH':
+            raise foldUtils.FoldSelectionError("Active object must be a mesh")
+        others = context.objects_in_mode if obRoot.mode == 'EDIT' else context.selected_objects
+        papers = [obRoot] + [ob for ob in others if ob.type == 'MESH' and ob != obRoot]
+
+        # One switch to object mode writes back every edited mesh (back to the old mode if the fold fails)
+        foldUtils.recordUndo(foldUtils.restoreMode, obRoot, obRoot.mode)
+        with foldProfile.span('mode toggles'):
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+        # Retrieve and verify selected vertices of each paper
+        selected = []
+        for paper in papers:
+            try:
+                selected.append((paper, foldUtils.getSelectedVertices(paper.data)))
+            except foldUtils.FoldSelectionError as err:
+                if len(papers) == 1:
+                    raise
+                raise foldUtils.FoldSelectionError("%s: %s" % (paper.name, err))
+        return selected
+
+    def getTargetArmature(self, papers):
+        from . import foldUtils
+
+        collection = None
+        if self.collectionName != '':
+            collection = bpy.data.collections.get(self.collectionName)
+            if collection == None:
+                raise foldUtils.FoldSelectionError("There is no collection named '%s'" % self.collectionName)
+        return foldUtils.getSharedArmature(papers, 'Fold 001', self.armatureName, collection)
+
+    def groupSelectedVerts(self, obRoot, selectedVerts):
+        from . import foldUtils
+
+        # Group by position and compute fold plane
+        if self.flapOnly:
+            creaseEdges = foldUtils.getSelectedEdges(obRoot.data)
+            return foldUtils.groupFlapVertices(obRoot, selectedVerts[0], selectedVerts[1], creaseEdges)
+        return foldUtils.groupVertices(obRoot, selectedVerts[0], selectedVerts[1])
+
+    def groupPapers(self, context):
+        from . import foldProfile
+
+        # Validate every selection, then partition each paper and find the armature they share
+        with foldProfile.span('selection'):
+            papers = self.getSelectedPapers(context)
+        with foldProfile.span('partition'):
+            groups = [self.groupSelectedVerts(obRoot, selectedVerts) for obRoot, selectedVerts in papers]
+        armatureObj = self.getTargetArmature([obRoot for obRoot, _ in papers])
+        return [obRoot for obRoot, _ in papers], groups, armatureObj
 
-        # Process the vertices
-        else:
-            # Group by position and compute fold plane
-            planer, left, right, q, n = foldUtils.groupVertices(obRoot, selectedVerts[0], selectedVerts[1])
+    def createSingleFold(self, context, dir, linked, asParent = False):
+        return self.profileFold(context, self.buildSingleFold, context, dir, linked, asParent)
 
-            # Create armature for requested direction (optionally linked as parent or copy)
+    def createDualFold(self, context, asParent, inverse = False):
+        return self.profileFold(context, self.buildDualFold, context, asParent, inverse)
+
+    def buildSingleFold(self, context, dir, linked, asParent = False):
+        from . import foldCache, foldKernel, foldUtils
+
+        cacheStats = foldCache.snapshotStats()
+        try:
+            papers, groups, armatureObj = self.groupPapers(context)
+        except foldKernel.FoldSelectionError as err:
+            self.report({'ERROR'}, str(err))
+            return False
+
+        # Folds made so far on the armature, shared by all papers
+        folds = foldUtils.loadFoldGraph(armatureObj)
+        side = foldKernel.SIDE_LEFT if dir == 'LEFT' else foldKernel.SIDE_RIGHT
+        mode = foldKernel.RIG_MODES.index(self.rigMode)
+
+        # Queue all armature edits so they are applied in one pass
+        batch = foldUtils.ArmatureBatch(armatureObj)
+        newBoneNames = []
+        for obRoot, (planer, left, right, q, n) in zip(papers, groups):
+            paperFolds = foldUtils.paperFolds(folds, obRoot)
+
+            # Linked folds share the number of the paper's last fold (unless that side is taken)
             linkTo = ''
-            newBoneName = ''
-            if linked and not asParent:
-                linkTo = CreateFoldMixin.foldBones[-1]
-
-            armatureObj = None
-            if dir == 'LEFT':
-                newBoneName, armatureObj = foldUtils.addSingleFoldArmature(CreateFoldMixin.foldCount, obRoot, 'LEFT', left, q, n, linkTo, False)
-            else:
-                newBoneName, armatureObj = foldUtils.addSingleFoldArmature(CreateFoldMixin.foldCount, obRoot, 'RIGHT', right, q, n, linkTo, False)
-
-            # Make Parent of all previously made bones
+            linkIndex = -1
+            foldNumber = folds.nextNumber()
+            if linked and len(paperFolds) > 0:
+                if not asParent:
+                    linkIndex = paperFolds[-1]
+                    linkTo = folds.boneNames[linkIndex]
+                lastNumber = int(max(folds.numbers[paperFolds]))
+                if folds.findFold(lastNumber, side) < 0:
+                    foldNumber = lastNumber
+
+            verts = left if dir == 'LEFT' else right
+            newBoneName, _ = foldUtils.addSingleFoldArmature(foldNumber, obRoot, dir, verts, q, n, linkTo, False, batch,
+                self.rigMode, armatureObj)
+
+            # Record the new fold
+            localQ, localN = foldUtils.paperPlane(obRoot, q, n)
+            newFold = folds.append(localQ, localN, side, newBoneName, linkIndex, foldNumber, mode)
+            newBoneNames.append(newBoneName)
+
+            # Make Parent of all previously made bones of this paper that have no parent yet
             if asParent:
-                for childBone in CreateFoldMixin.foldBones:
-                    foldUtils.parentBones(armatureObj, childBone, newBoneName)
-
-                # Clear newly parented bones from list
-                CreateFoldMixin.foldBones = []
-
-            # Append new bone to list
-            CreateFoldMixin.foldBones.append(newBoneName)
-
-    def createDualFold(self, context, asParent, inverse = False):
-        CreateFoldMixin.foldCount = CreateFoldMixin.foldCount + 1
-        
-        # Validate selection
-        selectedVerts = self.getSelectedVerts(context)
-        obRoot = context.active_object
-        if len(selectedVerts) != 2:
-            print("Must select 2+ vertices or 2+ edges in a mesh first")
-
-        # Process the vertices
-        else:
-            # Group by position and compute fold plane
-            planer, left, right, q, n = foldUtils.groupVertices(obRoot, selectedVerts[0], selectedVerts[1])
+                ownFolds = set(paperFolds)
+                for child in folds.roots():
+                    if child != newFold and child in ownFolds:
+                        batch.parentBones(folds.boneNames[child], newBoneName)
+                        folds.setParent(child, newFold)
+
+        batch.apply()
+        foldUtils.storeFoldGraph(armatureObj, folds)
+        self.report({'INFO'}, "Created %s (%s)" % (', '.join(newBoneNames), foldCache.describeStats(cacheStats)))
+
+        return True
+
+    def buildDualFold(self, context, asParent, inverse = False):
+        from . import foldCache, foldKernel, foldUtils
+
+        cacheStats = foldCache.snapshotStats()
+        try:
+            papers, groups, armatureObj = self.groupPapers(context)
+        except foldKernel.FoldSelectionError as err:
+            self.report({'ERROR'}, str(err))
+            return False
+
+        # Folds made so far on the armature, shared by all papers
+        folds = foldUtils.loadFoldGraph(armatureObj)
+        mode = foldKernel.RIG_MODES.index(self.rigMode)
+
+        batch = foldUtils.ArmatureBatch(armatureObj)
+        newBoneNames = []
+        for obRoot, (planer, left, right, q, n) in zip(papers, groups):
+            paperFolds = set(foldUtils.paperFolds(folds, obRoot))
+            foldNumber = folds.nextNumber()
 
             # Create armature for both directions linked to one another
-            leftBoneName, armatureObj = foldUtils.addSingleFoldArmature(CreateFoldMixin.foldCount, obRoot, 'LEFT', left, q, n)
-            rightBoneName, _ = foldUtils.addSingleFoldArmature(CreateFoldMixin.foldCount, obRoot, 'RIGHT', right, q, n, leftBoneName)
-
-            # Add parenting
+            leftBoneName, _ = foldUtils.addSingleFoldArmature(foldNumber, obRoot, 'LEFT', left, q, n, '', False, batch,
+                self.rigMode, armatureObj)
+            rightBoneName, _ = foldUtils.addSingleFoldArmature(foldNumber, obRoot, 'RIGHT', right, q, n, leftBoneName, False,
+                batch, self.rigMode, armatureObj)
+            newBoneNames.extend([leftBoneName, rightBoneName])
+
+            # Add folds to the graph (right is linked to left)
+            localQ, localN = foldUtils.paperPlane(obRoot, q, n)
+            leftFold = folds.append(localQ, localN, foldKernel.SIDE_LEFT, leftBoneName, -1, foldNumber, mode)
+            rightFold = folds.append(localQ, localN, foldKernel.SIDE_RIGHT, rightBoneName, leftFold, foldNumber, mode)
+
+            # Add parenting (only this paper's folds)
             if asParent:
-                for childBoneName in CreateFoldMixin.foldBones:
-                    if 'LEFT' in childBoneName:
-                        if inverse:
-                            foldUtils.parentBones(armatureObj, childBoneName, rightBoneName)
-                        else:
-                            foldUtils.parentBones(armatureObj, childBoneName, leftBoneName)
+                for child in folds.roots():
+                    if child not in paperFolds:
+                        continue
+                    if (folds.sides[child] == foldKernel.SIDE_LEFT) != inverse:
+                        parent = leftFold
                     else:
-                        if inverse:
-                            foldUtils.parentBones(armatureObj, childBoneName, leftBoneName)
-                        else:
-                            foldUtils.parentBones(armatureObj, childBoneName, rightBoneName)
+                        parent = rightFold
+                    batch.parentBones(folds.boneNames[child], folds.boneNames[parent])
+                    folds.setParent(child, parent)
 
-                # Clear newly parented bones from list
-                CreateFoldMixin.foldBones = []
+        batch.apply()
+        foldUtils.storeFoldGraph(armatureObj, folds)
+        self.report({'INFO'}, "Created %s (%s)" % (', '.join(newBoneNames), foldCache.describeStats(cacheStats)))
 
-            # Add bones to fold history
-            CreateFoldMixin.foldBones.append(leftBoneName)
-            CreateFoldMixin.foldBones.append(rightBoneName)
+        return True
 
 class CreateLeftFold(bpy.types.Operator, CreateFoldMixin):
     """Create left-side fold on selected edge"""
     bl_idname = "object.create_fold_left"
     bl_label = "Create Left Fold"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @classmethod
     def poll(cls, context):
         return context.object is not None and context.object.type == 'MESH'
 
     def execute(self, context):
-        self.createSingleFold(context, 'LEFT', False)
+        if not self.createSingleFold(context, 'LEFT', False):
+            return {'CANCELLED'}
 
         # Indicate operator completed
         return {'FINISHED'}
@@ -128,13 +296,15 @@ class CreateLinkedLeftFold(bpy.types.Operator, CreateFoldMixin):
     """Create left-side fold on selected edge (linked to previous fold)"""
     bl_idname = "object.create_fold_linked_left"
     bl_label = "Create Linked Left Fold"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @classmethod
     def poll(cls, context):
         return context.object is not None and context.object.type == 'MESH'
 
     def execute(self, context):
-        self.createSingleFold(context, 'LEFT', True)
+        if not self.createSingleFold(context, 'LEFT', True):
+            return {'CANCELLED'}
 
         # Indicate operator completed
         return {'FINISHED'}
@@ -146,13 +316,15 @@ class CreateParentLeftFold(bpy.types.Operator, CreateFoldMixin):
     """Create left-side fold on selected edge (as parent of all previous left folds)"""
     bl_idname = "object.create_fold_parent_left"
     bl_label = "Create Parent Left Fold"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @classmethod
     def poll(cls, context):
         return context.object is not None and context.object.type == 'MESH'
 
     def execute(self, context):
-        self.createSingleFold(context, 'LEFT', True, True)
+        if not self.createSingleFold(context, 'LEFT', True, True):
+            return {'CANCELLED'}
 
         # Indicate operator completed
         return {'FINISHED'}
@@ -164,13 +336,15 @@ class CreateRightFold(bpy.types.Operator, CreateFoldMixin):
     """Create right-side fold on selected edge"""
     bl_idname = "object.create_fold_right"
     bl_label = "Create Right Fold"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @classmethod
     def poll(cls, context):
         return context.object is not None and context.object.type == 'MESH'
 
     def execute(self, context):
-        self.createSingleFold(context, 'RIGHT', False)
+        if not self.createSingleFold(context, 'RIGHT', False):
+            return {'CANCELLED'}
 
         # Indicate operator completed
         return {'FINISHED'}
@@ -182,13 +356,15 @@ class CreateLinkedRightFold(bpy.types.Operator, CreateFoldMixin):
     """Create right-side fold on selected edge (linked to previous fold)"""
     bl_idname = "object.create_fold_linked_right"
     bl_label = "Create Linked Right Fold"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @classmethod
     def poll(cls, context):
         return context.object is not None and context.object.type == 'MESH'
 
     def execute(self, context):
-        self.createSingleFold(context, 'RIGHT', True)
+        if not self.createSingleFold(context, 'RIGHT', True):
+            return {'CANCELLED'}
 
         # Indicate operator completed
         return {'FINISHED'}
@@ -200,13 +376,15 @@ class CreateParentRightFold(bpy.types.Operator, CreateFoldMixin):
     """Create right-side fold on selected edge (as parent all previous right folds)"""    
     bl_idname = "object.create_fold_parent_right"
     bl_label = "Create Parent Right Fold"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @classmethod
     def poll(cls, context):
         return context.object is not None and context.object.type == 'MESH'
 
     def execute(self, context):
-        self.createSingleFold(context, 'RIGHT', True)
+        if not self.createSingleFold(context, 'RIGHT', True):
+            return {'CANCELLED'}
 
         # Indicate operator completed
         return {'FINISHED'}
@@ -218,13 +396,15 @@ class CreateDualFold(bpy.types.Operator, CreateFoldMixin):
     """Create linked dual-fold on selected edge"""
     bl_idname = "object.create_fold_dual"
     bl_label = "Create Dual Fold"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @classmethod
     def poll(cls, context):
         return context.object is not None and context.object.type == 'MESH'
 
     def execute(self, context):
-        self.createDualFold(context)
+        if not self.createDualFold(context, False):
+            return {'CANCELLED'}
 
         # Indicate operator completed
         return {'FINISHED'}
@@ -236,13 +416,15 @@ class CreateParentDualFold(bpy.types.Operator, CreateFoldMixin):
     """Create linked dual-fold on selected edge (as parents of all previous folds)"""
     bl_idname = "object.create_parent_fold_dual"
     bl_label = "Create Parent Dual Fold"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @classmethod
     def poll(cls, context):
         return context.object is not None and context.object.type == 'MESH'
 
     def execute(self, context):
-        self.createDualFold(context, True)
+        if not self.createDualFold(context, True):
+            return {'CANCELLED'}
 
         # Indicate operator completed
         return {'FINISHED'}
@@ -254,13 +436,15 @@ class CreateInverseParentDualFold(bpy.types.Operator, CreateFoldMixin):
     """Create linked dual-fold on selected edge (as parents of all previous folds in reverse)"""
     bl_idname = "object.create_inverse_parent_fold_dual"
     bl_label = "Create Inverse Parent Dual Fold"
+    bl_options = {'REGISTER', 'UNDO'}
 
     @classmethod
     def poll(cls, context):
         return context.object is not None and context.object.type == 'MESH'
 
     def execute(self, context):
-        self.createDualFold(context, True, True)
+        if not self.createDualFold(context, True, True):
+            return {'CANCELLED'}
 
         # Indicate operator completed
         return {'FINISHED'}
@@ -268,8 +452,363 @@ class CreateInverseParentDualFold(bpy.types.Operator, CreateFoldMixin):
     def invoke(self, context, event):
         return self.execute(context)
 
+class CreateAutoParentFolds(bpy.types.Operator, FoldProfileMixin):
+    """Create a fold for every selected crease line, nesting folds whose moving side lies inside another's"""
+    bl_idname = "object.create_folds_auto_parent"
+    bl_label = "Create Folds (Auto Parent)"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    foldSide: bpy.props.EnumProperty(
+        name="Fold Side",
+        description="Which side of each crease the fold bone moves",
+        items=[('LEFT', "Left", "Fold the left side of each crease"),
+            ('RIGHT', "Right", "Fold the right side of each crease")],
+        default='LEFT')
+
+    rigMode: bpy.props.EnumProperty(
+        name="Rig Mode",
+        description="How fold bones are held to their crease and follow linked folds",
+        items=[('CONSTRAINTS', "Constraints", "Limit Rotation and Copy Rotation constraints (evaluated every frame)"),
+            ('LOCKED', "Rotation Locks", "Rotation locks only, linked folds copy keys with 'Sync Linked Folds' (faster playback)")],
+        default='CONSTRAINTS')
+
+    @classmethod
+    def poll(cls, context):
+        return context.object is not None and context.object.type == 'MESH'
+
+    def buildAutoFolds(self, context):
+        from . import foldCache, foldProfile, foldUtils
+
+        cacheStats = foldCache.snapshotStats()
+        foldUtils.recordUndo(foldUtils.restoreMode, context.active_object, context.active_object.mode)
+        with foldProfile.span('mode toggles'):
+            bpy.ops.object.mode_set(mode='OBJECT')
+        obRoot = context.active_object
+
+        # Every straight run of selected edges is one crease
+        with foldProfile.span('selection'):
+            lines = foldUtils.selectedCreaseLines(obRoot.data)
+        if len(lines) == 0:
+            self.report({'ERROR'}, "Select the crease edges to fold")
+            return False
+        creases = [(v0, v1, self.foldSide) for v0, v1 in lines]
+
+        # Nest folds by containment of their moving verts, then rig them all in one pass
+        partition = foldUtils.partitionCreases(obRoot, creases)
+        parents, conflicts, order = foldUtils.inferFoldParents(creases, partition[1], partition[2])
+        firstFold = foldUtils.nextFoldNumber(foldUtils.findFoldArmature(obRoot))
+        boneNames, _ = foldUtils.rigFolds(obRoot, creases, firstFold, partition=partition, parents=parents, order=order,
+            rigMode=self.rigMode)
+
+        # Partly overlapping folds are left unparented
+        if len(conflicts) > 0:
+            self.report({'WARNING'}, "%d pairs of folds partly overlap and were not nested (e.g. %s and %s)" % (
+                len(conflicts), boneNames[conflicts[0][0]], boneNames[conflicts[0][1]]))
+        self.report({'INFO'}, "Created %d folds, %d nested (%s)" % (len(boneNames),
+            int((parents >= 0).sum()), foldCache.describeStats(cacheStats)))
+
+        return True
+
+    def execute(self, context):
+        if not self.profileFold(context, self.buildAutoFolds, context):
+            return {'CANCELLED'}
+
+        # Indicate operator completed
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        return self.execute(context)
+
+class PreviewFold(bpy.types.Operator, CreateFoldMixin):
+    """Preview a fold on the selected edge by dragging the mouse, then create it on confirm"""
+    bl_idname = "object.preview_fold"
+    bl_label = "Preview Fold"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    foldSide: bpy.props.EnumProperty(
+        name="Fold Side",
+        description="Which side of the crease moves",
+        items=[('LEFT', "Left", "Create a left fold"),
+            ('RIGHT', "Right", "Create a right fold"),
+            ('DUAL', "Dual", "Create a dual fold (both sides move)")],
+        default='LEFT')
+
+    @classmethod
+    def poll(cls, context):
+        return context.object is not None and context.object.type == 'MESH'
+
+    def getSelectedPapers(self, context):
+        # The preview only ever shows the active paper, so only that one is folded
+        return [(context.active_object, self.getSelectedVerts(context))]
+
+    def startPreview(self, context):
+        import numpy as np
+        from . import foldCache, foldUtils
+
+        # Partition once, everything the mouse drag needs is cached in arrays
+        # (flap mode marks the crease as a seam, which is taken back if the preview is cancelled)
+        selectedVerts = self.getSelectedVerts(context)
+        obRoot = context.active_object
+        self.previewUndo = foldUtils.FoldTransaction()
+        with self.previewUndo:
+            planer, left, right, q, n = self.groupSelectedVerts(obRoot, selectedVerts)
+        self.rest = foldCache.readLocalCoords(obRoot)
+        self.coords = self.rest.copy()
+        self.pivot = np.array(selectedVerts[0].co, dtype=np.float32)
+        self.axis = np.array(selectedVerts[1].co, dtype=np.float32) - self.pivot
+
+        # Moving verts relative to the crease, with the direction each side turns
+        sides = {'LEFT': [(left, 1.0)], 'RIGHT': [(right, -1.0)], 'DUAL': [(left, 1.0), (right, -1.0)]}
+        self.moving = []
+        for verts, sign in sides[self.foldSide]:
+            if len(verts) > 0:
+                # A contiguous run of verts is written through a slice instead of a gather
+                target = slice(verts[0], verts[-1] + 1) if verts[-1] - verts[0] + 1 == len(verts) else verts
+                relative = self.rest[verts] - self.pivot
+                self.moving.append((target, relative, np.empty_like(relative), sign))
+        self.angle = 0.0
+
+    def updatePreview(self, context):
+        from . import foldKernel
+
+        # Only the moving side is rotated, the mesh is written in one bulk copy
+        for target, relative, moved, sign in self.moving:
+            foldKernel.rotateAboutAxis(relative, self.pivot, self.axis, sign * self.angle, moved)
+            self.coords[target] = moved
+        mesh = context.active_object.data
+        mesh.vertices.foreach_set('co', self.coords.ravel())
+        mesh.update()
+        context.area.header_text_set("Fold angle: %.1f deg   Ctrl: snap to 15 deg   LMB/Enter: create fold   RMB/Esc: cancel" %
+            math.degrees(self.angle))
+
+    def endPreview(self, context):
+        # Put the paper back at rest before anything else reads it
+        mesh = context.active_object.data
+        mesh.vertices.foreach_set('co', self.rest.ravel())
+        mesh.update()
+        context.area.header_text_set(None)
+
+    def invoke(self, context, event):
+        from . import foldKernel
+
+        if context.area == None or context.area.type != 'VIEW_3D':
+            self.report({'ERROR'}, "Fold preview needs a 3D viewport")
+            return {'CANCELLED'}
+        self.startMode = context.active_object.mode
+        try:
+            self.startPreview(context)
+        except foldKernel.FoldSelectionError as err:
+            self.report({'ERROR'}, str(err))
+            bpy.ops.object.mode_set(mode=self.startMode)
+            return {'CANCELLED'}
+
+        self.startX = event.mouse_x
+        self.updatePreview(context)
+        context.window_manager.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'MOUSEMOVE':
+            # Half a degree per pixel of horizontal drag
+            self.angle = math.radians((event.mouse_x - self.startX) * 0.5)
+            if event.ctrl:
+                step = math.radians(15.0)
+                self.angle = round(self.angle / step) * step
+            self.updatePreview(context)
+
+        elif event.type in {'LEFTMOUSE', 'RET', 'NUMPAD_ENTER'} and event.value == 'PRESS':
+            self.endPreview(context)
+            if self.foldSide == 'DUAL':
+                created = self.createDualFold(context, False)
+            else:
+                created = self.createSingleFold(context, self.foldSide, False)
+            if not created:
+                self.previewUndo.rollback()
+                bpy.ops.object.mode_set(mode=self.startMode)
+            return {'FINISHED'} if created else {'CANCELLED'}
+
+        elif event.type in {'RIGHTMOUSE', 'ESC'} and event.value == 'PRESS':
+            self.endPreview(context)
+            self.previewUndo.rollback()
+            bpy.ops.object.mode_set(mode=self.startMode)
+            return {'CANCELLED'}
+
+        return {'RUNNING_MODAL'}
+
+    def execute(self, context):
+        # Without the mouse (e.g. redo panel), just create the fold
+        if self.foldSide == 'DUAL':
+            created = self.createDualFold(context, False)
+        else:
+            created = self.createSingleFold(context, self.foldSide, False)
+        return {'FINISHED'} if created else {'CANCELLED'}
+
+class SyncLinkedFolds(bpy.types.Operator):
+    """Copy the fold angle and its keyframes to folds linked without constraints"""
+    bl_idname = "object.sync_linked_folds"
+    bl_label = "Sync Linked Folds"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj is not None and (obj.type == 'ARMATURE' or (obj.parent is not None and obj.parent.type == 'ARMATURE'))
+
+    def execute(self, context):
+        from . import foldUtils
+
+        obj = context.object
+        armatureObj = obj if obj.type == 'ARMATURE' else obj.parent
+        synced = foldUtils.syncLinkedFolds(armatureObj)
+        self.report({'INFO'}, "Synced %d linked folds" % synced)
+
+        # Indicate operator completed
+        return {'FINISHED'}
+
+class BevelFoldCreases(bpy.types.Operator, FoldProfileMixin):
+    """Bevel every crease (seam) of the paper at once, grading the fold weights across each bevel"""
+    bl_idname = "object.bevel_fold_creases"
+    bl_label = "Bevel Fold Creases"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    width: bpy.props.FloatProperty(name="Width", description="Distance from the crease to each side of the bevel",
+        default=0.003, min=0.0, subtype='DISTANCE', precision=4)
+    segments: bpy.props.IntProperty(name="Segments", description="Segments across each bevel", default=3, min=1)
+
+    @classmethod
+    def poll(cls, context):
+        return context.object is not None and context.object.type == 'MESH'
+
+    def buildBevel(self, context):
+        from . import foldProfile, foldUtils
+
+        # The mesh is rebuilt from object mode data
+        obRoot = context.active_object
+        foldUtils.recordUndo(foldUtils.restoreMode, obRoot, obRoot.mode)
+        with foldProfile.span('mode toggles'):
+            bpy.ops.object.mode_set(mode='OBJECT')
+
+        creaseCount = foldUtils.bevelCreases(obRoot, self.width, self.segments)
+        if creaseCount == 0:
+            self.report({'ERROR'}, "No creases to bevel, creases are edges marked as seams")
+            return False
+        self.report({'INFO'}, "Beveled %d crease edges" % creaseCount)
+
+        return True
+
+    def execute(self, context):
+        if not self.profileFold(context, self.buildBevel, context):
+            return {'CANCELLED'}
+
+        # Indicate operator completed
+        return {'FINISHED'}
+
+class KeyFoldSchedule(bpy.types.Operator):
+    """Keyframe every fold of the rig from a schedule (order, start, duration, angle and easing)"""
+    bl_idname = "object.key_fold_schedule"
+    bl_label = "Key Fold Schedule"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    order: bpy.props.EnumProperty(
+        name="Order",
+        description="Order the folds are played in",
+        items=[('PARENTS', "Parents First", "A fold plays before the folds nested in it"),
+            ('CHILDREN', "Children First", "Nested folds play before the fold that carries them"),
+            ('NUMBER', "Fold Number", "In the order the folds were created")],
+        default='PARENTS')
+    frameStart: bpy.props.IntProperty(name="Start Frame", description="Frame the first fold starts on", default=1)
+    duration: bpy.props.IntProperty(name="Duration", description="Frames each fold takes", default=20, min=1)
+    stagger: bpy.props.IntProperty(name="Stagger",
+        description="Frames between the starts of consecutive folds (less than the duration overlaps them)", default=20)
+    angle: bpy.props.FloatProperty(name="Angle", description="Fold angle at the end of each fold",
+        default=math.pi, subtype='ANGLE')
+    useCreaseAngles: bpy.props.BoolProperty(name="Use Crease Angles",
+        description="Use the fold angle stored on the bone (e.g. from an imported pattern) when there is one",
+        default=True)
+    interpolation: bpy.props.EnumProperty(
+        name="Easing",
+        description="How each fold eases from flat to its angle",
+        items=[('BEZIER', "Smooth", "Bezier ease in and out"),
+            ('LINEAR', "Linear", "Constant speed"),
+            ('SINE', "Sine", "Sinusoidal ease in and out"),
+            ('CUBIC', "Cubic", "Cubic ease in and out"),
+            ('BACK', "Back", "Overshoot a little and settle"),
+            ('BOUNCE', "Bounce", "Bounce into place")],
+        default='BEZIER')
+    filepath: bpy.props.StringProperty(name="Schedule File",
+        description="JSON list of per fold entries that override the settings above (empty: schedule every fold)",
+        subtype='FILE_PATH', default="")
+
+    @classmethod
+    def poll(cls, context):
+        obj = context.object
+        return obj is not None and (obj.type == 'ARMATURE' or (obj.parent is not None and obj.parent.type == 'ARMATURE'))
+
+    def invoke(self, context, event):
+        self.frameStart = context.scene.frame_start
+        return context.window_manager.invoke_props_dialog(self)
+
+    def foldAngle(self, bone):
+        if self.useCreaseAngles and bone != None and bone.get('origami_fold_angle') != None:
+            return math.radians(bone['origami_fold_angle'])
+        return self.angle
+
+    def buildSchedule(self, armatureObj, folds):
+        from . import foldUtils
+
+        # Linked folds are left out, they follow the fold they are linked to
+        if self.filepath:
+            items = foldUtils.readFoldSchedule(bpy.path.abspath(self.filepath), folds)
+        else:
+            order = folds.topologicalOrder()
+            if self.order == 'CHILDREN':
+                order = order[::-1]
+            elif self.order == 'NUMBER':
+                order = sorted(order.tolist(), key=lambda index: (int(folds.numbers[index]), index))
+            items = [(int(index), {}) for index in order]
+
+        # Anything an entry leaves out comes from the operator settings, folds start one after another
+        bones = armatureObj.data.bones
+        easings = [item.identifier for item in self.bl_rna.properties['interpolation'].enum_items]
+        entries = []
+        start = self.frameStart
+        for index, item in items:
+            if folds.links[index] >= 0:
+                continue
+            start = item.get('start', start)
+            angle = item.get('angle')
+            angle = math.radians(angle) if angle != None else self.foldAngle(bones.get(folds.boneNames[index]))
+            interpolation = item.get('easing', self.interpolation).upper()
+            if interpolation not in easings:
+                raise ValueError("unknown easing '%s'" % interpolation)
+
+            # Penner easings ease in on their own, folds should also ease out
+            easing = 'EASE_IN_OUT' if interpolation in ('SINE', 'CUBIC') else 'AUTO'
+            entries.append((index, start, item.get('duration', self.duration), angle, interpolation, easing))
+            start = start + self.stagger
+        return entries
+
+    def execute(self, context):
+        from . import foldUtils
+
+        obj = context.object
+        armatureObj = obj if obj.type == 'ARMATURE' else obj.parent
+        folds = foldUtils.loadFoldGraph(armatureObj)
+        try:
+            entries = self.buildSchedule(armatureObj, folds)
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            self.report({'ERROR'}, "Could not read fold schedule: %s" % err)
+            return {'CANCELLED'}
+
+        keyed, synced = foldUtils.keyFoldSchedule(armatureObj, entries)
+        self.report({'INFO'}, "Keyed %d folds, synced %d linked folds" % (keyed, synced))
+
+        # Indicate operator completed
+        return {'FINISHED'}
+
 # Setup self registration
 classes = [CreateLeftFold, CreateLinkedLeftFold, CreateParentLeftFold,
     CreateRightFold, CreateLinkedRightFold, CreateParentRightFold,
-    CreateDualFold, CreateParentDualFold, CreateInverseParentDualFold]
+    CreateDualFold, CreateParentDualFold, CreateInverseParentDualFold,
+    CreateAutoParentFolds, SyncLinkedFolds, PreviewFold, KeyFoldSchedule, BevelFoldCreases]
 register, unregister = bpy.utils.register_classes_factory(classes)
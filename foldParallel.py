@@ -0,0 +1,88 @@
+import os
+import sys
+
+import numpy as np
+
+from . import foldKernel
+
+# Shared memory needs Python 3.8+ (Blender 2.93 and later), otherwise run serially
+try:
+    from multiprocessing import get_context, shared_memory
+except ImportError:
+    shared_memory = None
+
+# Spawning workers only pays off for big meshes with several folds
+minParallelWork = 5000000
+
+# Views onto the shared blocks, set up once in every worker
+workerArrays = {}
+
+def classifyInto(coords, planes, eps, out):
+    # Pack the left/right masks of each fold plane into bits
+    for i, (q, n) in enumerate(planes):
+        signedDist = foldKernel.signedDistances(coords, q, n)
+        out[0, i] = np.packbits(signedDist > eps)
+        out[1, i] = np.packbits(signedDist < -eps)
+
+def attachWorker(coordsName, vertCount, outName, foldCount):
+    coordsBlock = shared_memory.SharedMemory(name=coordsName)
+    outBlock = shared_memory.SharedMemory(name=outName)
+    workerArrays['blocks'] = (coordsBlock, outBlock)
+    workerArrays['coords'] = np.ndarray((vertCount, 3), dtype=np.float64, buffer=coordsBlock.buf)
+    workerArrays['out'] = np.ndarray((2, foldCount, (vertCount + 7) // 8), dtype=np.uint8, buffer=outBlock.buf)
+
+def classifyRange(task):
+    # Only the plane range travels to the worker, vertex data is read from shared memory
+    start, planes, eps = task
+    classifyInto(workerArrays['coords'], planes, eps, workerArrays['out'][:, start:start + len(planes)])
+
+def pythonExecutable():
+    # Blender before 2.91 reports its own binary as sys.executable
+    bpyModule = sys.modules.get('bpy')
+    return getattr(getattr(bpyModule, 'app', None), 'binary_path_python', None) or sys.executable
+
+def partitionFolds(coords, planes, eps = 1e-4, processes = None):
+    coords = np.ascontiguousarray(coords, dtype=np.float64).reshape(-1, 3)
+    planes = np.asarray(planes, dtype=np.float64).reshape(-1, 2, 3)
+    vertCount, foldCount = len(coords), len(planes)
+    width = (vertCount + 7) // 8
+
+    if processes == None:
+        processes = os.cpu_count() or 1
+    processes = min(processes, foldCount)
+
+    # Small jobs are faster without the process start-up cost
+    if shared_memory == None or processes < 2 or vertCount * foldCount < minParallelWork:
+        out = np.empty((2, foldCount, width), dtype=np.uint8)
+        classifyInto(coords, planes, eps, out)
+        return out[0], out[1]
+
+    coordsBlock = shared_memory.SharedMemory(create=True, size=max(coords.nbytes, 1))
+    outBlock = shared_memory.SharedMemory(create=True, size=max(2 * foldCount * width, 1))
+    try:
+        np.ndarray(coords.shape, dtype=np.float64, buffer=coordsBlock.buf)[:] = coords
+        out = np.ndarray((2, foldCount, width), dtype=np.uint8, buffer=outBlock.buf)
+
+        # A few chunks per worker keeps them busy when folds finish unevenly
+        chunk = max(1, foldCount // (processes * 4))
+        tasks = [(start, planes[start:start + chunk], eps) for start in range(0, foldCount, chunk)]
+
+        # Spawn rather than fork, forking a running Blender is not safe
+        context = get_context('spawn')
+        context.set_executable(pythonExecutable())
+        with context.Pool(processes, initializer=attachWorker,
+                initargs=(coordsBlock.name, vertCount, outBlock.name, foldCount)) as pool:
+            pool.map(classifyRange, tasks)
+
+        result = out.copy()
+        del out
+    finally:
+        coordsBlock.close()
+        coordsBlock.unlink()
+        outBlock.close()
+        outBlock.unlink()
+
+    return result[0], result[1]
+
+def bitsToIndices(bits, vertCount):
+    return np.flatnonzero(np.unpackbits(bits, count=vertCount))
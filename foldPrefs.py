@@ -0,0 +1,52 @@
+# Import system and blender modules
+import bpy
+from bpy.props import BoolProperty, IntProperty, StringProperty
+
+class OrigamiFoldPreferences(bpy.types.AddonPreferences):
+    """Origami Fold add-on preferences"""
+    bl_idname = __package__
+
+    reportTimings: BoolProperty(
+        name="Report Stage Timings",
+        description="Show how long each stage of a fold took in the status bar",
+        default=False)
+
+    timingLog: StringProperty(
+        name="Timing Log",
+        description="Append stage timings of every fold operator to this file as JSON lines (empty: off)",
+        subtype='FILE_PATH',
+        default="")
+
+    profileNext: BoolProperty(
+        name="Profile Next Fold",
+        description="Run the next fold operator under cProfile (switches itself off afterwards)",
+        default=False)
+
+    profileOutput: StringProperty(
+        name="Profile Output",
+        description="Save cProfile stats to this file for snakeviz/pstats (empty: print to the console)",
+        subtype='FILE_PATH',
+        default="")
+
+    profileLines: IntProperty(
+        name="Lines",
+        description="Number of functions printed to the console",
+        default=25, min=1)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "reportTimings")
+        layout.prop(self, "timingLog")
+        row = layout.row()
+        row.prop(self, "profileNext")
+        row.prop(self, "profileLines")
+        layout.prop(self, "profileOutput")
+
+def getPreferences(context):
+    # None when the add-on runs without being enabled (e.g. from a script)
+    addon = context.preferences.addons.get(__package__)
+    return addon.preferences if addon != None else None
+
+# Setup self registration
+classes = [OrigamiFoldPreferences]
+register, unregister = bpy.utils.register_classes_factory(classes)
@@ -0,0 +1,99 @@
+# Timing spans for the stages of a fold operator (no bpy, safe to import anywhere)
+import cProfile
+import io
+import json
+import pstats
+import time
+
+# Profilers currently collecting spans, innermost last
+activeProfilers = []
+
+class NullSpan:
+    """Span used when nothing is being profiled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+nullSpan = NullSpan()
+
+class Span:
+    """Time one stage and add it to the profiler that is active"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler.path.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        seconds = time.perf_counter() - self.start
+        self.profiler.addTime('/'.join(self.profiler.path), seconds)
+        self.profiler.path.pop()
+        return False
+
+class Profiler:
+    """Collect stage times of one operator run, nested stages are named 'outer/inner'"""
+
+    def __init__(self, label):
+        self.label = label
+        self.path = []
+        self.stages = {}
+        self.calls = {}
+        self.total = 0.0
+
+    def __enter__(self):
+        activeProfilers.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        self.total = time.perf_counter() - self.start
+        activeProfilers.remove(self)
+        return False
+
+    def addTime(self, stage, seconds):
+        # Repeated stages (e.g. both sides of a dual fold) are summed
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.calls[stage] = self.calls.get(stage, 0) + 1
+
+    def summary(self):
+        # Top level stages only, slowest first
+        topLevel = [(stage, seconds) for stage, seconds in self.stages.items() if '/' not in stage]
+        topLevel.sort(key=lambda item: -item[1])
+        parts = ['%s %.1f ms' % (stage, seconds * 1e3) for stage, seconds in topLevel]
+        return '%s: %.1f ms (%s)' % (self.label, self.total * 1e3, ', '.join(parts))
+
+    def record(self, **extra):
+        record = {'operator': self.label, 'time': time.time(), 'total_ms': self.total * 1e3,
+            'stages': {stage: {'ms': seconds * 1e3, 'calls': self.calls[stage]}
+                for stage, seconds in self.stages.items()}}
+        record.update(extra)
+        return record
+
+    def writeLog(self, path, **extra):
+        # One JSON object per line, appended so runs can be compared over time
+        with open(path, 'a') as f:
+            f.write(json.dumps(self.record(**extra)) + '\n')
+
+def span(name):
+    # Cheap no-op unless an operator is being profiled
+    if len(activeProfilers) == 0:
+        return nullSpan
+    return Span(activeProfilers[-1], name)
+
+def runCProfile(func, args, outputPath = None, lines = 25):
+    # Profile one call, save the raw stats or return the slowest functions as text
+    profile = cProfile.Profile()
+    result = profile.runcall(func, *args)
+    if outputPath:
+        profile.dump_stats(outputPath)
+        return result, None
+    text = io.StringIO()
+    pstats.Stats(profile, stream=text).sort_stats('cumulative').print_stats(lines)
+    return result, text.getvalue()
@@ -1,99 +1,189 @@
 import bpy
 import mathutils
-
-from . import bboxUtils
-
-def getSelectedVertices(obMesh):
+import numpy as np
+
+from . import foldCache, foldKernel, foldParallel, foldProfile
+from .foldKernel import FoldSelectionError
+
+# ID property on the armature data holding its fold graph
+foldGraphKey = 'origami_fold_graph'
+
+# Transactions currently recording, innermost last
+activeTransactions = []
+
+class FoldTransaction:
+    """Log of the data a fold operator changed, undone in reverse if the fold fails"""
+
+    def __init__(self):
+        self.undo = []
+
+    def __enter__(self):
+        activeTransactions.append(self)
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        activeTransactions.remove(self)
+        if excType != None:
+            self.rollback()
+        return False
+
+    def record(self, func, *args):
+        self.undo.append((func, args))
+
+    def rollback(self):
+        # Every step is attempted, even if an earlier one fails
+        undo, self.undo = self.undo, []
+        for func, args in reversed(undo):
+            try:
+                func(*args)
+            except (RuntimeError, ReferenceError, KeyError):
+                pass
+
+def recordUndo(func, *args):
+    # Cheap no-op outside of a transaction
+    if len(activeTransactions) > 0:
+        activeTransactions[-1].record(func, *args)
+
+def restoreMode(obj, mode):
+    bpy.context.view_layer.objects.active = obj
+    bpy.ops.object.mode_set(mode=mode)
+
+def restoreSeams(obMesh, seams):
+    obMesh.edges.foreach_set('use_seam', seams)
+
+def removeObject(obj):
+    data = obj.data
+    bpy.data.objects.remove(obj)
+    if data != None and data.users == 0:
+        if isinstance(data, bpy.types.Armature):
+            bpy.data.armatures.remove(data)
+
+def restoreParent(obRoot, parent, parentType, parentInverse):
+    obRoot.parent = parent
+    obRoot.parent_type = parentType
+    obRoot.matrix_parent_inverse = parentInverse
+
+def removeVertexGroup(obRoot, groupName):
+    group = obRoot.vertex_groups.get(groupName)
+    if group != None:
+        obRoot.vertex_groups.remove(group)
+    foldCache.invalidateWeighted(obRoot)
+
+def restoreIdProperty(owner, key, value):
+    if value == None:
+        owner.pop(key, None)
+    else:
+        owner[key] = value
+
+def restoreBones(armatureObj, newBones, oldParents):
+    # Bone edits need edit mode, all of them are reverted in one session
+    if len(newBones) == 0 and len(oldParents) == 0:
+        return
+    activeObj = bpy.context.view_layer.objects.active
+    bpy.context.view_layer.objects.active = armatureObj
+    bpy.ops.object.mode_set(mode='EDIT')
+    editBones = armatureObj.data.edit_bones
+    for childBoneName, parentBoneName in oldParents:
+        childBone = editBones.get(childBoneName)
+        if childBone != None:
+            childBone.parent = editBones.get(parentBoneName) if parentBoneName != None else None
+    for boneName in newBones:
+        bone = editBones.get(boneName)
+        if bone != None:
+            editBones.remove(bone)
+    bpy.ops.object.mode_set(mode='OBJECT')
+    bpy.context.view_layer.objects.active = activeObj
+
+def removeConstraints(armatureObj, constraints):
+    for boneName, constraintName in constraints:
+        poseBone = armatureObj.pose.bones.get(boneName)
+        if poseBone != None and poseBone.constraints.get(constraintName) != None:
+            poseBone.constraints.remove(poseBone.constraints[constraintName])
+
+def restoreLocks(armatureObj, locks):
+    for boneName, rotationMode, lockRotation in locks:
+        poseBone = armatureObj.pose.bones.get(boneName)
+        if poseBone != None:
+            poseBone.rotation_mode = rotationMode
+            poseBone.lock_rotation = lockRotation
+
+def getSelectionMask(collection):
+    # Read the select flag of every element in one bulk copy
+    mask = np.empty(len(collection), dtype=bool)
+    collection.foreach_get('select', mask)
+    return mask
+
+def getSelectedVertices(obMesh, eps = 1e-4):
     # Find all selected vertices
-    selectedVerts = [v for v in obMesh.vertices if v.select]
-
-    # If there were no selected vertices, look for an edge instead
-    if len(selectedVerts) != 2:
-        # Get selected edges
-        selectedEdges = [e for e in obMesh.edges if e.select]
-
-        # If there was only one, extract its endpoints
-        if len(selectedEdges) == 1:
-            edge = selectedEdges[0]
-            selectedVerts = [
-                obMesh.vertices[edge.vertices[0]],
-                obMesh.vertices[edge.vertices[1]]
-            ]
-
-        # If more than 1, find the absolute endpoints
-        elif len(selectedEdges) > 1:
-            # Gather all the vertices
-            allVerts = []
-            for edge in selectedEdges:
-                allVerts.append(obMesh.vertices[edge.vertices[0]])
-                allVerts.append(obMesh.vertices[edge.vertices[1]])
-            
-            # Compute the bounding box
-            bboxVal, bboxCorners = bboxUtils.computeBBox(allVerts)
-
-            # DEBUG: Output bounding box details
-            # print('BBox coords:')
-            # print('\tX: [', bboxVal[0], 'to', bboxVal[1], ']')
-            # print('\tY: [', bboxVal[2], 'to', bboxVal[3], ']')
-            # print('BBox Corners:', bboxCorners)
-
-            # Use corners as selected verts
-            if len(bboxCorners) == 2:
-                selectedVerts = [
-                    obMesh.vertices[bboxCorners[0]],
-                    obMesh.vertices[bboxCorners[1]]
-                ]
-
-    # Return what we found
-    return selectedVerts
-
-def computeWorldPlane(obRoot, v0, v1, vertNorm):
-    midPoint = (v0 + v1) / 2.0
-
-    # Construct plane equation along fold and mesh vert normal in world coords
-    worldQ = midPoint @ obRoot.matrix_world
-
-    worldV0 = v0 @ obRoot.matrix_world
-    worldV1 = v1 @ obRoot.matrix_world
-    worldFoldVec = (worldV1 - worldV0).normalized()
-
-    worldVertNorm = vertNorm.to_4d()
-    worldVertNorm.w = 0
-    worldVertNorm = (worldVertNorm @ obRoot.matrix_world).to_3d()
-
-    worldNorm = worldFoldVec.cross(worldVertNorm).normalized()
-
-    return worldQ, worldNorm
+    selectedIdx = np.flatnonzero(getSelectionMask(obMesh.vertices))
+    if len(selectedIdx) == 2:
+        return [obMesh.vertices[int(i)] for i in selectedIdx]
+
+    # If there were not exactly two selected vertices, look for edges instead
+    edgeMask = getSelectionMask(obMesh.edges)
+    if not np.any(edgeMask):
+        raise FoldSelectionError("Must select 2+ vertices or 2+ edges in a mesh first")
+
+    # Walk the selected edges to find the true endpoints of the fold line
+    edgeVerts = np.empty(len(obMesh.edges) * 2, dtype=np.int32)
+    obMesh.edges.foreach_get('vertices', edgeVerts)
+    edgeVerts = edgeVerts.reshape(-1, 2)[edgeMask]
+    start, end, chainVerts = foldKernel.walkEdgeChain(edgeVerts)
+
+    # Every vertex along the chain must lie on the line between the endpoints
+    coords = np.empty(len(obMesh.vertices) * 3, dtype=np.float32)
+    obMesh.vertices.foreach_get('co', coords)
+    foldKernel.checkCollinear(coords.reshape(-1, 3), chainVerts, start, end, eps)
+
+    # Return the two endpoints
+    return [obMesh.vertices[int(start)], obMesh.vertices[int(end)]]
+
+def computeFoldPlane(obRoot, selectedVertex0, selectedVertex1):
+    # Plane through the fold, facing -X or +Y, as mathutils vectors for bone placement
+    worldQ, worldNorm = foldKernel.foldPlane(selectedVertex0.co, selectedVertex1.co,
+        selectedVertex0.normal, obRoot.matrix_world)
+    return mathutils.Vector(worldQ), mathutils.Vector(worldNorm)
 
 def groupVertices(obRoot, selectedVertex0, selectedVertex1, eps = 1e-4):
-    # Get world space plane equation
-    worldQ, worldNorm = computeWorldPlane(obRoot, selectedVertex0.co, selectedVertex1.co, selectedVertex0.normal)
+    worldQ, worldNorm = computeFoldPlane(obRoot, selectedVertex0, selectedVertex1)
 
-    # Ensure the plane normal aligns roughly with -X or +Y
-    facing = worldNorm.dot(mathutils.Vector([-1, 0, 0]))
-    if abs(facing) < 1e-2: # Too close to perpendicular, use Y instead
-        facing = worldNorm.dot(mathutils.Vector([0, 1, 0]))
-    
-    # Flip plane normal if required
-    if facing < 0:
-        worldNorm = worldNorm * -1
-
-    # Test all verts to find groups
-    planer, left, right = [[], [], []]
-    for v in obRoot.data.vertices:
-        # Compute signed distance to plane
-        worldVert = v.co @ obRoot.matrix_world
-        signedDist = worldNorm.dot(worldVert - worldQ)
-
-        # Group based on signed distance
-        if signedDist > eps:
-            left.append(v)
-        elif signedDist < -eps:
-            right.append(v)
-        else:
-            planer.append(v)
-    
-    # Return group lists
+    # Compute signed distance to plane for all verts at once
+    with foldProfile.span('world coords'):
+        worldCoords = foldCache.getWorldCoords(obRoot)
+    with foldProfile.span('classify'):
+        planer, left, right = foldKernel.classify(worldCoords, np.array(worldQ), np.array(worldNorm), eps)
+
+    # Return groups as arrays of vertex indices
+    return [planer, left, right, worldQ, worldNorm]
+
+def getSelectedEdges(obMesh):
+    return np.flatnonzero(getSelectionMask(obMesh.edges))
+
+def markCreaseEdges(obMesh, creaseEdges):
+    # Creases are stored as seams so flap regions stop at them
+    seams = np.empty(len(obMesh.edges), dtype=bool)
+    obMesh.edges.foreach_get('use_seam', seams)
+    if not np.all(seams[creaseEdges]):
+        recordUndo(restoreSeams, obMesh, seams.copy())
+        seams[creaseEdges] = True
+        obMesh.edges.foreach_set('use_seam', seams)
+
+def groupFlapVertices(obRoot, selectedVertex0, selectedVertex1, creaseEdges, eps = 1e-4):
+    worldQ, worldNorm = computeFoldPlane(obRoot, selectedVertex0, selectedVertex1)
+    if len(creaseEdges) == 0:
+        raise FoldSelectionError("Select the crease edges to fold a single flap")
+
+    # Regions of faces bounded by creases (built once per mesh, then split as creases are added)
+    with foldProfile.span('flap regions'):
+        markCreaseEdges(obRoot.data, creaseEdges)
+        regions = foldCache.getFlapRegions(obRoot)
+    with foldProfile.span('world coords'):
+        worldCoords = foldCache.getWorldCoords(obRoot)
+    with foldProfile.span('classify'):
+        planer, left, right = foldKernel.flapPartition(regions, worldCoords, creaseEdges,
+            np.array(worldQ), np.array(worldNorm), eps)
+
+    # Return groups in the same layout as groupVertices
     return [planer, left, right, worldQ, worldNorm]
 
 def makeArmature(armatureName, headPos):
@@ -108,132 +198,618 @@ def makeArmature(armatureName, headPos):
     # Return the armature
     return armatureObj
 
-def addBoneToArmature(armatureObj, boneName, head, direction):
-    # Ensure armature is selected and in edit mode
-    armatureObj.select_set(True)
-    bpy.context.view_layer.objects.active = armatureObj
-    bpy.ops.object.editmode_toggle()
+class ArmatureBatch:
+    """Queue of bone, parent and constraint edits applied to an armature in one pass"""
 
-    # Add one edit bone
-    bone = armatureObj.data.edit_bones.new(boneName)
+    def __init__(self, armatureObj = None):
+        self.armatureObj = armatureObj
+        self.newBones = []
+        self.parents = []
+        self.limits = []
+        self.locks = []
+        self.links = []
 
-    # Position the tail and head of the bone
-    bone.head = head
-    bone.tail = head + direction
+    def addBone(self, boneName, head, direction):
+        self.newBones.append((boneName, head.copy(), head + direction))
 
-    # Exit edit mode
-    bpy.ops.object.editmode_toggle()
+    def parentBones(self, childBoneName, parentBoneName):
+        self.parents.append((childBoneName, parentBoneName))
 
-def setupPoseBone(armatureObj, boneName):
-    # Switch to pose mode
-    armatureObj.select_set(True)
-    bpy.context.view_layer.objects.active = armatureObj
-    bpy.ops.object.posemode_toggle()
+    def setupPoseBone(self, boneName, locked = False):
+        if locked:
+            self.locks.append(boneName)
+        else:
+            self.limits.append(boneName)
+
+    def linkPoseBones(self, boneNameA, boneNameB, locked = False):
+        # Locked bones have no constraint, their link lives in the fold graph (see syncLinkedFolds)
+        if not locked:
+            self.links.append((boneNameA, boneNameB))
+
+    def apply(self):
+        armatureObj = self.armatureObj
+
+        # All bone and parent edits happen in a single edit mode session
+        if len(self.newBones) > 0 or len(self.parents) > 0:
+            createdBones = []
+            oldParents = []
+            recordUndo(restoreBones, armatureObj, createdBones, oldParents)
+
+            armatureObj.select_set(True)
+            bpy.context.view_layer.objects.active = armatureObj
+            with foldProfile.span('mode toggles'):
+                bpy.ops.object.editmode_toggle()
+
+            with foldProfile.span('bone creation'):
+                editBones = armatureObj.data.edit_bones
+                for boneName, head, tail in self.newBones:
+                    bone = editBones.new(boneName)
+                    bone.head = head
+                    bone.tail = tail
+                    createdBones.append(bone.name)
+
+                for childBoneName, parentBoneName in self.parents:
+                    # Setup parent relationship with offset
+                    parentBone = editBones.get(parentBoneName)
+                    childBone = editBones.get(childBoneName)
+                    if parentBone != None and childBone != None:
+                        oldParents.append((childBone.name, childBone.parent.name if childBone.parent != None else None))
+                        childBone.use_connect = False
+                        childBone.use_inherit_rotation = True
+                        childBone.inherit_scale = 'FULL'
+                        childBone.parent = parentBone
+
+            # Leaving edit mode rebuilds the pose so constraints can be added directly
+            with foldProfile.span('mode toggles'):
+                bpy.ops.object.editmode_toggle()
+
+        with foldProfile.span('constraint setup'):
+            self.addConstraints()
+
+        # Batch is now empty and can be reused
+        self.newBones, self.parents, self.limits, self.locks, self.links = [], [], [], [], []
+
+    def addConstraints(self):
+        armatureObj = self.armatureObj
+        constraints = []
+        oldLocks = []
+        recordUndo(removeConstraints, armatureObj, constraints)
+        recordUndo(restoreLocks, armatureObj, oldLocks)
+
+        # Constraints do not need pose mode, only existing pose bones
+        for boneName in self.limits:
+            poseBone = armatureObj.pose.bones.get(boneName)
+            if poseBone != None:
+                rotationConstraint = poseBone.constraints.new('LIMIT_ROTATION')
+                constraints.append((boneName, rotationConstraint.name))
+                rotationConstraint.owner_space = 'LOCAL'
+                rotationConstraint.use_limit_y = True
+                rotationConstraint.use_limit_z = True
+
+        # Constraint free bones: rotation locks only stop Y and Z being posed, nothing is evaluated per frame
+        for boneName in self.locks:
+            poseBone = armatureObj.pose.bones.get(boneName)
+            if poseBone != None:
+                oldLocks.append((boneName, poseBone.rotation_mode, tuple(poseBone.lock_rotation)))
+                poseBone.rotation_mode = 'XYZ'
+                poseBone.lock_rotation = (False, True, True)
+
+        for boneNameA, boneNameB in self.links:
+            poseBoneB = armatureObj.pose.bones.get(boneNameB)
+            if poseBoneB != None:
+                copyRotationConstraint = poseBoneB.constraints.new('COPY_ROTATION')
+                constraints.append((boneNameB, copyRotationConstraint.name))
+                copyRotationConstraint.target = armatureObj
+                copyRotationConstraint.subtarget = boneNameA
+                copyRotationConstraint.use_y = False
+                copyRotationConstraint.use_z = False
+                copyRotationConstraint.target_space = 'LOCAL'
+                copyRotationConstraint.owner_space = 'LOCAL'
 
-    # Retrieve pose bone and add constraint
-    poseBone = armatureObj.pose.bones.get(boneName)
-    if poseBone != None:
-        rotationConstraint = poseBone.constraints.new('LIMIT_ROTATION')    
-        rotationConstraint.owner_space = 'LOCAL'
-        rotationConstraint.use_limit_y = True
-        rotationConstraint.use_limit_z = True
+def addBoneToArmature(armatureObj, boneName, head, direction):
+    batch = ArmatureBatch(armatureObj)
+    batch.addBone(boneName, head, direction)
+    batch.apply()
 
-    # Exit pose mode
-    bpy.ops.object.posemode_toggle()
+def setupPoseBone(armatureObj, boneName):
+    batch = ArmatureBatch(armatureObj)
+    batch.setupPoseBone(boneName)
+    batch.apply()
 
 def bevelSelectedFold(size = 0.003, segments = 3):
     bpy.ops.object.editmode_toggle()
     bpy.ops.mesh.bevel(offset=size, offset_pct=0, segments=segments, affect='EDGES')
     bpy.ops.object.editmode_toggle()
 
+# Bone that never moves, holding the still side of bevel bands next to unrigged paper
+restBoneName = 'Fold Rest Bone'
+
+def ensureRestBone(obRoot, armatureObj):
+    # The armature modifier normalizes weights, so a graded band needs a weight on a bone that stays put
+    if armatureObj.data.bones.get(restBoneName) == None:
+        batch = ArmatureBatch(armatureObj)
+        batch.addBone(restBoneName, mathutils.Vector((0.0, 0.0, 0.0)), mathutils.Vector((0.0, 0.1, 0.0)))
+        batch.apply()
+    group = obRoot.vertex_groups.get(restBoneName)
+    if group == None:
+        group = obRoot.vertex_groups.new(name=restBoneName)
+        recordUndo(removeVertexGroup, obRoot, group.name)
+    return group.index
+
+def paperPlane(obRoot, q, n):
+    # Fold planes are recorded in the paper's object space, so they still fit its creases after it moves
+    planePoints, normals = foldKernel.localPlanes(np.array(q)[None], np.array(n)[None], obRoot.matrix_world)
+    return planePoints[0], normals[0]
+
+def bevelCreases(obRoot, width = 0.003, segments = 3):
+    import bmesh
+    from mathutils import kdtree
+
+    # Fold planes of this paper, recorded in its object space (the bevel width is in object units too)
+    armatureObj = findFoldArmature(obRoot)
+    folds = loadFoldGraph(armatureObj)
+    groups = obRoot.vertex_groups
+    own = [index for index in paperFolds(folds, obRoot) if not np.isnan(folds.planePoints[index]).any()]
+    planePoints, normals = folds.planePoints[own], folds.normals[own]
+    signs = np.array([1.0 if folds.sides[index] == foldKernel.SIDE_LEFT else -1.0 for index in own])
+    restGroup = ensureRestBone(obRoot, armatureObj) if len(own) > 0 else -1
+
+    # Every crease in one bmesh session
+    mesh = obRoot.data
+    bm = bmesh.new()
+    bm.from_mesh(mesh)
+    deform = bm.verts.layers.deform.verify()
+    creases = [edge for edge in bm.edges if edge.seam]
+    if len(creases) == 0:
+        bm.free()
+        return 0
+
+    # Weights of the crease verts, looked up by position once the bevel has replaced them
+    creaseVerts = list({vert for edge in creases for vert in edge.verts})
+    tree = kdtree.KDTree(len(creaseVerts))
+    for i, vert in enumerate(creaseVerts):
+        tree.insert(vert.co, i)
+    tree.balance()
+    creaseWeights = [dict(vert[deform].items()) for vert in creaseVerts]
+
+    with foldProfile.span('bevel'):
+        bandVerts = bmesh.ops.bevel(bm, geom=creases, offset=width, offset_type='OFFSET', segments=segments,
+            profile=0.5, affect='EDGES', clamp_overlap=True, mark_seam=True)['verts']
+
+    # Grade the fold weights across each band, the other side keeps what the crease had (or the rest bone)
+    with foldProfile.span('band weights'):
+        coords = np.array([vert.co[:] for vert in bandVerts]).reshape(-1, 3)
+        bandFold, across = foldKernel.bevelBands(coords, planePoints, normals, signs, width)
+        for vert, fold, t in zip(bandVerts, bandFold.tolist(), across.tolist()):
+            if fold < 0:
+                continue
+            index = own[fold]
+            group = groups[folds.boneNames[index]].index
+            # The other half of a dual fold turns the still side (linked folds may share a number on another crease)
+            partner = folds.findFold(int(folds.numbers[index]), 1 - int(folds.sides[index]))
+            partnerGroup = None
+            if partner >= 0 and np.allclose(folds.planePoints[partner], folds.planePoints[index]):
+                partnerGroup = groups.get(folds.boneNames[partner])
+
+            weights = {group: t}
+            if partnerGroup != None:
+                weights[partnerGroup.index] = 1.0 - t
+            else:
+                base = creaseWeights[tree.find(vert.co)[1]]
+                for other, weight in base.items():
+                    if other != group:
+                        weights[other] = weight * (1.0 - t)
+                if len(weights) == 1:
+                    weights[restGroup] = 1.0 - t
+
+            dvert = vert[deform]
+            dvert.clear()
+            for other, weight in weights.items():
+                if weight > 1e-6:
+                    dvert[other] = weight
+
+    # A single rebuild of the mesh, the cached coordinates and weights no longer match it
+    with foldProfile.span('write mesh'):
+        bm.to_mesh(mesh)
+        bm.free()
+        mesh.update()
+    foldCache.invalidateCoords(obRoot)
+    foldCache.invalidateWeighted(obRoot)
+
+    return len(creases)
+
 def linkPoseBones(armatureObj, boneNameA, boneNameB):
-    # Switch to pose mode
-    armatureObj.select_set(True)
-    bpy.context.view_layer.objects.active = armatureObj
-    bpy.ops.object.posemode_toggle()
-
-    # Retrieve pose bone and add constraint
-    poseBoneB = armatureObj.pose.bones.get(boneNameB)
-    if poseBoneB != None:
-        copyRotationConstraint = poseBoneB.constraints.new('COPY_ROTATION')    
-        copyRotationConstraint.target = armatureObj
-        copyRotationConstraint.subtarget = boneNameA
-        copyRotationConstraint.use_y = False
-        copyRotationConstraint.use_z = False
-        copyRotationConstraint.target_space = 'LOCAL'
-        copyRotationConstraint.owner_space = 'LOCAL'
-
-    # Exit pose mode
-    bpy.ops.object.posemode_toggle()
+    batch = ArmatureBatch(armatureObj)
+    batch.linkPoseBones(boneNameA, boneNameB)
+    batch.apply()
 
 def parentBones(armatureObj, childBoneName, parentBoneName):
-    # Switch to edit mode
-    armatureObj.select_set(True)
-    bpy.context.view_layer.objects.active = armatureObj
-    bpy.ops.object.editmode_toggle()
-
-    # Retrieve edit bone references
-    parentBone = armatureObj.data.edit_bones[parentBoneName]
-    childBone = armatureObj.data.edit_bones[childBoneName]
+    batch = ArmatureBatch(armatureObj)
+    batch.parentBones(childBoneName, parentBoneName)
+    batch.apply()
 
-    # Setup parent relationship with offset
-    if parentBone != None and childBone != None:
-        childBone.use_connect = False
-        childBone.use_inherit_rotation = True
-        childBone.inherit_scale = 'FULL'
-        childBone.parent = parentBone
+def createVertexGroup(obRoot, verts, boneName, unique):
+    with foldProfile.span('vertex groups'):
+        writeVertexGroup(obRoot, verts, boneName, unique)
 
-    # Exit edit mode
-    bpy.ops.object.editmode_toggle()
+def writeVertexGroup(obRoot, verts, boneName, unique):
+    # Get array of just vertex indexes
+    vertexIndexList = np.asarray(verts, dtype=np.int64)
 
-def createVertexGroup(obRoot, verts, boneName, unique):    
-    # Get list of just vertex indexes
     # If unique, leave out ones already in another vertex group
-    vertexIndexList = []
-    for v in verts:
-        if not unique or len(v.groups.items()) == 0:
-            vertexIndexList.append(v.index)
+    weighted = foldCache.getWeightedMask(obRoot)
+    if unique:
+        vertexIndexList = vertexIndexList[~weighted[vertexIndexList]]
     
     # Create the vertex group
     newVertexGroup = obRoot.vertex_groups.new(name=boneName)
-    newVertexGroup.add(vertexIndexList, 1.0, 'ADD')
+    recordUndo(removeVertexGroup, obRoot, newVertexGroup.name)
+    newVertexGroup.add(vertexIndexList.tolist(), 1.0, 'ADD')
+    foldCache.markWeighted(obRoot, vertexIndexList)
 
-def addSingleFoldArmature(foldCount, obRoot, dir, verts, headPos, direction, linkTo = '', asParent = False):
-    # Generate name using count
-    name = 'Fold %03d' % foldCount
+def paperCollection(obRoot):
+    # The collection the paper is in (files need not have a 'Collection')
+    if len(obRoot.users_collection) > 0:
+        return obRoot.users_collection[0]
+    return bpy.context.scene.collection
 
+def getFoldArmature(obRoot, name, collection = None):
     # Does this mesh already have an armature parent?
     armatureObj = obRoot.parent
     if armatureObj == None or obRoot.parent_type != 'ARMATURE':
         # Create a new armature with proper location and orientation
         armatureObj = makeArmature(name, obRoot.location)
-        bpy.data.collections['Collection'].objects.link(armatureObj)
+        if collection == None:
+            collection = paperCollection(obRoot)
+        collection.objects.link(armatureObj)
+        recordUndo(removeObject, armatureObj)
 
-    # Add a single bone
-    boneName = name + ' ' + dir + ' Bone'
-    tailDir = direction
-    if dir == 'RIGHT':
-        tailDir = tailDir * -1
-    addBoneToArmature(armatureObj, boneName, headPos, tailDir)
+    return armatureObj
+
+def getSharedArmature(papers, name, armatureName = '', collection = None):
+    # One armature for all papers: the one asked for, the one they are rigged to, or a new one
+    if armatureName != '':
+        armatureObj = bpy.data.objects.get(armatureName)
+        if armatureObj == None or armatureObj.type != 'ARMATURE':
+            raise FoldSelectionError("'%s' is not an armature" % armatureName)
+    else:
+        rigged = [findFoldArmature(obRoot) for obRoot in papers if findFoldArmature(obRoot) != None]
+        armatureObj = rigged[0] if len(rigged) > 0 else None
+
+    # A paper deforms with a single armature
+    for obRoot in papers:
+        current = findFoldArmature(obRoot)
+        if current != None and current != armatureObj:
+            raise FoldSelectionError("%s is already rigged to %s" % (obRoot.name, current.name))
+
+    if armatureObj == None:
+        if len(papers) == 1:
+            return getFoldArmature(papers[0], name, collection)
+
+        # Bones are placed in the armature's own space, an armature shared by several papers sits at the origin
+        armatureObj = makeArmature(name, mathutils.Vector((0.0, 0.0, 0.0)))
+        if collection == None:
+            collection = paperCollection(papers[0])
+        collection.objects.link(armatureObj)
+        recordUndo(removeObject, armatureObj)
+
+    return armatureObj
 
+def paperFolds(folds, obRoot):
+    # Folds of one paper in a (possibly shared) armature: the ones with a vertex group on it
+    return [index for index in range(len(folds)) if obRoot.vertex_groups.get(folds.boneNames[index]) != None]
+
+def findFoldArmature(obRoot):
+    # The armature a mesh is already rigged to, if any
+    if obRoot.parent != None and obRoot.parent_type == 'ARMATURE':
+        return obRoot.parent
+    return None
+
+def loadFoldGraph(armatureObj):
+    # Fold graph stored on the armature data, so it is saved with the file and follows undo
+    if armatureObj == None:
+        return foldKernel.FoldTable()
+    props = armatureObj.data.get(foldGraphKey)
+    if props == None:
+        return rebuildFoldGraph(armatureObj)
+    return foldKernel.FoldTable.fromProps({key: props[key].to_list() if hasattr(props[key], 'to_list')
+        else props[key] if isinstance(props[key], str) else list(props[key]) for key in props.keys()})
+
+def storeFoldGraph(armatureObj, folds):
+    oldGraph = armatureObj.data.get(foldGraphKey)
+    recordUndo(restoreIdProperty, armatureObj.data, foldGraphKey, oldGraph.to_dict() if oldGraph != None else None)
+    armatureObj.data[foldGraphKey] = folds.toProps()
+
+def rebuildFoldGraph(armatureObj):
+    # Rigs made before the graph was stored: recover folds from bone names, parents and constraints
+    folds = foldKernel.FoldTable()
+    bones = armatureObj.data.bones
+    for bone in bones:
+        parts = bone.name.split(' ')
+        if len(parts) == 4 and parts[0] == 'Fold' and parts[1].isdigit() and parts[2] in foldKernel.SIDE_NAMES:
+            folds.append(np.full(3, np.nan), np.full(3, np.nan), foldKernel.SIDE_NAMES.index(parts[2]),
+                bone.name, -1, int(parts[1]))
+
+    for index, boneName in enumerate(folds.boneNames):
+        parent = bones[boneName].parent
+        if parent != None and folds.find(parent.name) >= 0:
+            folds.setParent(index, folds.find(parent.name))
+        poseBone = armatureObj.pose.bones.get(boneName)
+        for constraint in poseBone.constraints if poseBone != None else []:
+            if constraint.type == 'COPY_ROTATION' and folds.find(constraint.subtarget) >= 0:
+                folds.setLink(index, folds.find(constraint.subtarget))
+
+    return folds
+
+def nextFoldNumber(armatureObj):
+    # Continue numbering after the highest fold already on the armature
+    return loadFoldGraph(armatureObj).nextNumber()
+
+def armatureMatrix(armatureObj):
+    # matrix_world is only updated when the depsgraph is evaluated, which a new armature has not been yet
+    if armatureObj.parent == None:
+        return armatureObj.matrix_basis.copy()
+    return armatureObj.matrix_world.copy()
+
+def parentToArmature(obRoot, armatureObj):
     # Make sure paper is parented to armature
     if obRoot.parent != armatureObj:
+        recordUndo(restoreParent, obRoot, obRoot.parent, obRoot.parent_type, obRoot.matrix_parent_inverse.copy())
         obRoot.parent = armatureObj
         obRoot.parent_type = 'ARMATURE'
-        obRoot.matrix_parent_inverse = armatureObj.matrix_world.inverted()
+        obRoot.matrix_parent_inverse = armatureMatrix(armatureObj).inverted()
+
+def addSingleFoldArmature(foldCount, obRoot, dir, verts, headPos, direction, linkTo = '', asParent = False, batch = None, rigMode = 'CONSTRAINTS',
+        armatureObj = None):
+    # Generate name using count
+    name = 'Fold %03d' % foldCount
+    if armatureObj == None:
+        armatureObj = getFoldArmature(obRoot, name)
+
+    # Without a batch from the caller, apply the bone edits right away
+    ownBatch = batch == None
+    if ownBatch:
+        batch = ArmatureBatch(armatureObj)
+    elif batch.armatureObj == None:
+        batch.armatureObj = armatureObj
+
+    # Add a single bone (fold planes are in world space, bones in the armature's)
+    boneName = name + ' ' + dir + ' Bone'
+    toArmature = armatureMatrix(armatureObj).inverted()
+    tailDir = toArmature.to_3x3() @ mathutils.Vector(direction)
+    if dir == 'RIGHT':
+        tailDir = tailDir * -1
+    batch.addBone(boneName, toArmature @ mathutils.Vector(headPos), tailDir)
+
+    # Make sure paper is parented to armature
+    parentToArmature(obRoot, armatureObj)
 
     # Make an appropriate vertex group named for the bone
     createVertexGroup(obRoot, verts, boneName, True)
 
-    # Create pose bone and set constraints
-    setupPoseBone(armatureObj, boneName)
+    # Create pose bone and set constraints (or rotation locks)
+    locked = rigMode == 'LOCKED'
+    batch.setupPoseBone(boneName, locked)
 
     # Optionally link bone to another bone
     if linkTo != '':
         if asParent:
-            parentBones(armatureObj, linkTo, boneName)
+            batch.parentBones(linkTo, boneName)
         else:
-            linkPoseBones(armatureObj, linkTo, boneName)
+            batch.linkPoseBones(linkTo, boneName, locked)
+
+    if ownBatch:
+        batch.apply()
 
     # Return bone name for use in linking as well as armature object
     return boneName, armatureObj
+
+def boneCurvePath(boneName, prop):
+    return 'pose.bones["%s"].%s' % (bpy.utils.escape_identifier(boneName), prop)
+
+def copyFoldCurve(action, sourceBone, targetBone):
+    # Replace the target's fold angle curve with a copy of the source's, keys copied in bulk
+    sourceCurve = action.fcurves.find(boneCurvePath(sourceBone, 'rotation_euler'), index=0)
+    if sourceCurve == None:
+        return False
+    targetPath = boneCurvePath(targetBone, 'rotation_euler')
+    targetCurve = action.fcurves.find(targetPath, index=0)
+    if targetCurve != None:
+        action.fcurves.remove(targetCurve)
+    targetCurve = action.fcurves.new(targetPath, index=0, action_group=targetBone)
+
+    sourcePoints = sourceCurve.keyframe_points
+    targetPoints = targetCurve.keyframe_points
+    targetPoints.add(len(sourcePoints))
+    values = np.empty(len(sourcePoints) * 2, dtype=np.float32)
+    for attr in ('co', 'handle_left', 'handle_right'):
+        sourcePoints.foreach_get(attr, values)
+        targetPoints.foreach_set(attr, values)
+
+    # Enum settings have no bulk access
+    for sourcePoint, targetPoint in zip(sourcePoints, targetPoints):
+        targetPoint.interpolation = sourcePoint.interpolation
+        targetPoint.handle_left_type = sourcePoint.handle_left_type
+        targetPoint.handle_right_type = sourcePoint.handle_right_type
+    targetCurve.update()
+    return True
+
+def syncLinkedFolds(armatureObj):
+    # Constraint free linked folds copy the fold angle (and its keys) from the fold they are linked to
+    folds = loadFoldGraph(armatureObj)
+    poseBones = armatureObj.pose.bones
+    animData = armatureObj.animation_data
+    action = animData.action if animData != None else None
+
+    synced = 0
+    for index in folds.topologicalOrder():
+        linkTo = int(folds.links[index])
+        if linkTo < 0 or folds.modes[index] != foldKernel.RIG_LOCKED:
+            continue
+        source = poseBones.get(folds.boneNames[linkTo])
+        target = poseBones.get(folds.boneNames[index])
+        if source == None or target == None:
+            continue
+
+        target.rotation_euler[0] = source.matrix_basis.to_euler('XYZ')[0]
+        if action != None:
+            copyFoldCurve(action, source.name, target.name)
+        synced = synced + 1
+
+    return synced
+
+def writeFoldCurve(action, boneName, frames, angles, interpolation = 'BEZIER', easing = 'AUTO'):
+    # Replace a bone's fold angle curve, keys are written in bulk
+    path = boneCurvePath(boneName, 'rotation_euler')
+    curve = action.fcurves.find(path, index=0)
+    if curve != None:
+        action.fcurves.remove(curve)
+    curve = action.fcurves.new(path, index=0, action_group=boneName)
+
+    points = curve.keyframe_points
+    points.add(len(frames))
+    co = np.empty(len(frames) * 2, dtype=np.float32)
+    co[0::2] = frames
+    co[1::2] = angles
+    points.foreach_set('co', co)
+
+    # Enum settings have no bulk access
+    for point in points:
+        point.interpolation = interpolation
+        point.easing = easing
+    curve.update()
+    return curve
+
+def readFoldSchedule(path, folds):
+    # JSON list of {"fold": number, "side": "LEFT"/"RIGHT" (optional), "start", "duration", "angle" (degrees), "easing"}
+    import json
+
+    with open(path, 'r') as f:
+        items = json.load(f)
+    entries = []
+    for item in items:
+        sides = [item['side']] if 'side' in item else foldKernel.SIDE_NAMES
+        for side in sides:
+            index = folds.findFold(int(item['fold']), foldKernel.SIDE_NAMES.index(side))
+            if index >= 0:
+                entries.append((index, item))
+    return entries
+
+def keyFoldSchedule(armatureObj, entries):
+    # Entries are (fold index, start frame, duration, angle, interpolation, easing), one fold angle curve each
+    folds = loadFoldGraph(armatureObj)
+    animData = armatureObj.animation_data
+    if animData == None:
+        animData = armatureObj.animation_data_create()
+    if animData.action == None:
+        animData.action = bpy.data.actions.new('%s Folds' % armatureObj.name)
+    action = animData.action
+
+    poseBones = armatureObj.pose.bones
+    keyed = 0
+    for index, start, duration, angle, interpolation, easing in entries:
+        poseBone = poseBones.get(folds.boneNames[index])
+        if poseBone == None:
+            continue
+
+        # Fold angles are keyed on the X rotation, which only plays in an euler rotation mode
+        poseBone.rotation_mode = 'XYZ'
+        writeFoldCurve(action, poseBone.name, [start, start + duration], [0.0, angle], interpolation, easing)
+        keyed = keyed + 1
+
+    # Linked folds follow through their constraint, or get a copy of the keys when constraint free
+    return keyed, syncLinkedFolds(armatureObj)
+
+def selectedCreaseLines(obMesh, tol = 1e-5):
+    from . import foldFormat
+
+    # Group the selected edges into straight crease lines (each becomes one fold)
+    edgeMask = getSelectionMask(obMesh.edges)
+    coords = np.empty(len(obMesh.vertices) * 3, dtype=np.float32)
+    obMesh.vertices.foreach_get('co', coords)
+    edges = np.empty(len(obMesh.edges) * 2, dtype=np.int32)
+    obMesh.edges.foreach_get('vertices', edges)
+
+    data = {
+        'vertices_coords': coords.reshape(-1, 3).astype(np.float64),
+        'edges_vertices': edges.reshape(-1, 2).astype(np.int64),
+        'edges_assignment': np.where(edgeMask, foldFormat.VALLEY, foldFormat.ASSIGNMENT_CODES['U']).astype(np.int8),
+        'edges_foldAngle': np.full(len(obMesh.edges), np.nan)
+    }
+    return [(v0, v1) for v0, v1, _, _, _ in foldFormat.creaseLines(data, tol)]
+
+def partitionCreases(obRoot, creases, processes = None, eps = 1e-4):
+    # Fold planes are cheap, compute them on the main thread
+    meshVerts = obRoot.data.vertices
+    planes = [computeFoldPlane(obRoot, meshVerts[v0], meshVerts[v1]) for v0, v1, _ in creases]
+
+    # Partition every crease at once, spread over worker processes
+    with foldProfile.span('partition'):
+        worldCoords = foldCache.getWorldCoords(obRoot)
+        planeArray = np.array([[tuple(q), tuple(n)] for q, n in planes])
+        leftBits, rightBits = foldParallel.partitionFolds(worldCoords, planeArray, eps, processes)
+
+    return planes, leftBits, rightBits
+
+def inferFoldParents(creases, leftBits, rightBits):
+    # Each fold moves the verts on its side, nest folds whose moving verts lie inside another's
+    movingBits = np.stack([rightBits[i] if side == 'RIGHT' else leftBits[i]
+        for i, (_, _, side) in enumerate(creases)])
+    with foldProfile.span('containment'):
+        return foldKernel.containmentParents(movingBits)
+
+def rigFolds(obRoot, creases, firstFold = 1, processes = None, eps = 1e-4, partition = None, parents = None, order = None,
+        rigMode = 'CONSTRAINTS'):
+    # Reuse the partition when the caller already computed it
+    if partition == None:
+        partition = partitionCreases(obRoot, creases, processes, eps)
+    planes, leftBits, rightBits = partition
+
+    # New folds are added to the armature's fold graph
+    armatureObj = getFoldArmature(obRoot, 'Fold %03d' % firstFold)
+    parentToArmature(obRoot, armatureObj)
+    folds = loadFoldGraph(armatureObj)
+
+    # Only bone and vertex group creation goes through bpy, in one batch
+    vertCount = len(obRoot.data.vertices)
+    batch = ArmatureBatch(armatureObj)
+    boneNames = [None] * len(creases)
+    foldOf = [-1] * len(creases)
+    rightNames = {}
+    mode = foldKernel.RIG_MODES.index(rigMode)
+    for i in order if order is not None else range(len(creases)):
+        q, n = planes[i]
+        localQ, localN = paperPlane(obRoot, q, n)
+        side = creases[i][2]
+        foldCount = firstFold + i
+        if side == 'RIGHT':
+            right = foldParallel.bitsToIndices(rightBits[i], vertCount)
+            boneName, _ = addSingleFoldArmature(foldCount, obRoot, 'RIGHT', right, q, n, '', False, batch, rigMode)
+            foldOf[i] = folds.append(localQ, localN, foldKernel.SIDE_RIGHT, boneName, -1, foldCount, mode)
+        else:
+            left = foldParallel.bitsToIndices(leftBits[i], vertCount)
+            boneName, _ = addSingleFoldArmature(foldCount, obRoot, 'LEFT', left, q, n, '', False, batch, rigMode)
+            foldOf[i] = folds.append(localQ, localN, foldKernel.SIDE_LEFT, boneName, -1, foldCount, mode)
+            if side == 'DUAL':
+                right = foldParallel.bitsToIndices(rightBits[i], vertCount)
+                rightNames[i], _ = addSingleFoldArmature(foldCount, obRoot, 'RIGHT', right, q, n, boneName, False, batch, rigMode)
+                folds.append(localQ, localN, foldKernel.SIDE_RIGHT, rightNames[i], foldOf[i], foldCount, mode)
+        boneNames[i] = boneName
+
+    # Nest folds in the same edit mode pass
+    if parents is not None:
+        for child, parent in enumerate(parents):
+            if parent >= 0:
+                batch.parentBones(boneNames[child], boneNames[parent])
+                folds.setParent(foldOf[child], foldOf[parent])
+
+    batch.apply()
+    storeFoldGraph(armatureObj, folds)
+
+    # Return bone names in crease order (right bone after left for dual folds) as well as armature object
+    names = []
+    for i, boneName in enumerate(boneNames):
+        names.append(boneName)
+        if i in rightNames:
+            names.append(rightNames[i])
+    return names, armatureObj
@@ -0,0 +1,117 @@
+# Import blender modules
+import bpy
+from bpy.props import BoolProperty, FloatProperty
+
+# Our own modules (and NumPy) are imported when the operator runs, keeping add-on startup fast
+
+def boneAssignments(obRoot, coords, creaseEdges, eps = 1e-4):
+    import numpy as np
+    from . import foldKernel, foldUtils
+
+    # Crease types recorded on the fold bones (e.g. by the FOLD importer), matched to the edges on each fold plane
+    # (planes are in the paper's object space, like the coordinates, so moving the rig does not matter)
+    mountain = np.zeros(len(creaseEdges), dtype=bool)
+    valley = np.zeros(len(creaseEdges), dtype=bool)
+    armatureObj = foldUtils.findFoldArmature(obRoot)
+    if armatureObj == None:
+        return mountain, valley
+
+    folds = foldUtils.loadFoldGraph(armatureObj)
+    bones = armatureObj.data.bones
+    ends = coords[creaseEdges]
+    for index in foldUtils.paperFolds(folds, obRoot):
+        record = folds[index]
+        bone = bones.get(record.boneName)
+        assignment = bone.get('origami_assignment') if bone != None else None
+        if assignment not in ('M', 'V'):
+            continue
+        onPlane = np.all(np.abs(foldKernel.signedDistances(ends.reshape(-1, 3), record.planePoint,
+            record.normal).reshape(-1, 2)) <= eps, axis=1)
+        mountain[onPlane] = assignment == 'M'
+        valley[onPlane] = assignment == 'V'
+    return mountain, valley
+
+def meshFlatFoldFailures(obRoot, tol = 1e-4):
+    import numpy as np
+    from . import foldCache, foldKernel
+
+    # Creases are the edges marked as seams
+    mesh = obRoot.data
+    edges = np.empty(len(mesh.edges) * 2, dtype=np.int64)
+    mesh.edges.foreach_get('vertices', edges)
+    seams = np.empty(len(mesh.edges), dtype=bool)
+    mesh.edges.foreach_get('use_seam', seams)
+    creaseEdges = edges.reshape(-1, 2)[seams]
+
+    loopVerts = np.empty(len(mesh.loops), dtype=np.int64)
+    mesh.loops.foreach_get('vertex_index', loopVerts)
+    loopStart = np.empty(len(mesh.polygons), dtype=np.int64)
+    mesh.polygons.foreach_get('loop_start', loopStart)
+    interior = ~foldKernel.boundaryVertices(loopVerts, loopStart, len(mesh.vertices))
+
+    worldCoords = foldCache.getWorldCoords(obRoot)
+    mountain, valley = boneAssignments(obRoot, foldCache.readLocalCoords(obRoot).astype(np.float64), creaseEdges)
+    verts, flags, kawasaki, mountains, valleys = foldKernel.flatFoldCheck(foldKernel.planarCoords(worldCoords),
+        creaseEdges, mountain, valley, interior, tol)
+    failing = flags != 0
+    return verts[failing], flags[failing], kawasaki[failing], mountains[failing], valleys[failing], len(verts)
+
+def describeFailure(flags, kawasaki, mountains, valleys):
+    from . import foldKernel
+
+    reasons = []
+    for flag, name in foldKernel.FLAT_NAMES:
+        if flags & flag:
+            reasons.append(name)
+    text = ', '.join(reasons)
+    if flags & foldKernel.FLAT_MAEKAWA:
+        text += ' (M %d, V %d)' % (mountains, valleys)
+    if flags & foldKernel.FLAT_KAWASAKI:
+        text += ' (off by %.4f rad)' % abs(kawasaki)
+    return text
+
+class CheckFlatFoldable(bpy.types.Operator):
+    """Check that the seam creases of the active paper can fold flat (Maekawa and Kawasaki at every crease vertex)"""
+    bl_idname = "object.check_flat_foldable"
+    bl_label = "Check Flat Foldable"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    tolerance: FloatProperty(name="Angle Tolerance",
+        description="Largest Kawasaki error (alternating sector angle sum) still accepted",
+        default=1e-4, min=0.0, subtype='ANGLE', precision=4)
+    selectFailures: BoolProperty(name="Select Vertices", description="Select the crease vertices that fail",
+        default=True)
+
+    @classmethod
+    def poll(cls, context):
+        return context.object is not None and context.object.type == 'MESH'
+
+    def execute(self, context):
+        from . import foldCollide, foldProfile
+
+        if context.mode != 'OBJECT':
+            bpy.ops.object.mode_set(mode='OBJECT')
+        obRoot = context.active_object
+
+        with foldProfile.Profiler(self.bl_idname) as profiler:
+            verts, flags, kawasaki, mountains, valleys, checked = meshFlatFoldFailures(obRoot, self.tolerance)
+
+        # Every failing vertex on the console, a summary in the status bar
+        for vert, flag, error, m, v in zip(verts.tolist(), flags.tolist(), kawasaki.tolist(), mountains.tolist(),
+                valleys.tolist()):
+            print('%s vertex %d: %s' % (obRoot.name, vert, describeFailure(flag, error, m, v)))
+        if self.selectFailures:
+            foldCollide.selectVertices(obRoot, verts)
+
+        if len(verts) == 0:
+            self.report({'INFO'}, "Flat foldable, %d crease vertices checked (%s)" % (checked, profiler.summary()))
+        else:
+            self.report({'WARNING'}, "%d of %d crease vertices cannot fold flat, see the console (%s)" % (
+                len(verts), checked, profiler.summary()))
+
+        # Indicate operator completed
+        return {'FINISHED'}
+
+# Setup self registration
+classes = [CheckFlatFoldable]
+register, unregister = bpy.utils.register_classes_factory(classes)
@@ -0,0 +1,248 @@
+# Fold kernel and FOLD reader checks that run without Blender
+#   python -m pytest tests
+import importlib
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+
+addonDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, addonDir)
+import foldKernel
+
+# foldFormat imports the kernel relative to the add-on package, which loads without bpy
+sys.path.insert(0, os.path.dirname(addonDir))
+foldFormat = importlib.import_module(os.path.basename(addonDir) + '.foldFormat')
+
+def paperMatrix(location, angle, scale = (1.0, 1.0, 1.0)):
+    # Object matrix as NumPy copies it from mathutils (column vectors, translation in the last column)
+    c, s = np.cos(angle), np.sin(angle)
+    matrix = np.eye(4)
+    matrix[:3, :3] = np.array([[c, -s, 0.0], [s, c, 0.0], [0.0, 0.0, 1.0]]) * np.array(scale)
+    matrix[:3, 3] = location
+    return matrix
+
+def creaseBand(width, segments):
+    # Bevel verts across a crease along local Y at x = 0.25 (from the still side to the moving side)
+    x = 0.25 + np.linspace(width, -width, segments + 2)
+    return np.stack([x, np.zeros_like(x), np.zeros_like(x)], axis=1)
+
+def test_worldTransformMatchesMatrixTimesPoint():
+    matrix = paperMatrix((3.0, 1.0, 0.5), np.pi / 2)
+    local = np.array([[1.0, 0.0, 0.0], [0.0, 2.0, 0.0]])
+    expected = (matrix @ np.hstack([local, np.ones((2, 1))]).T).T[:, :3]
+    assert np.allclose(foldKernel.worldTransform(local, matrix), expected)
+
+def test_localPlanesInvertsWorldPlane():
+    v0, v1, vertNorm = np.array([0.25, -1.0, 0.0]), np.array([0.25, 1.0, 0.0]), np.array([0.0, 0.0, 1.0])
+    for matrix in (np.eye(4), paperMatrix((3.0, 0.0, 0.0), 0.0), paperMatrix((3.0, -2.0, 1.0), 0.7, (2.0, 0.5, 1.0))):
+        worldQ, worldNorm = foldKernel.worldPlane(v0, v1, vertNorm, matrix)
+
+        # The crease stays on the plane in world space and again in object space
+        ends = foldKernel.worldTransform(np.stack([v0, v1]), matrix)
+        assert np.allclose(foldKernel.signedDistances(ends, worldQ, worldNorm), 0.0)
+        points, normals = foldKernel.localPlanes(worldQ[None], worldNorm[None], matrix)
+        assert np.allclose(foldKernel.signedDistances(np.stack([v0, v1]), points[0], normals[0]), 0.0)
+        assert np.allclose(np.abs(normals[0]), [1.0, 0.0, 0.0])
+
+def test_bevelBandsGradeAwayFromOrigin():
+    width, segments = 0.01, 3
+    coords = creaseBand(width, segments)
+    v0, v1, vertNorm = np.array([0.25, -1.0, 0.0]), np.array([0.25, 1.0, 0.0]), np.array([0.0, 0.0, 1.0])
+    for matrix in (np.eye(4), paperMatrix((3.0, 0.0, 0.0), 0.0), paperMatrix((3.0, -2.0, 1.0), 0.7)):
+        worldQ, worldNorm = foldKernel.foldPlane(v0, v1, vertNorm, matrix)
+        points, normals = foldKernel.localPlanes(worldQ[None], worldNorm[None], matrix)
+        fold, across = foldKernel.bevelBands(coords, points, normals, np.array([1.0]), width)
+
+        # Every band vertex belongs to the fold, graded evenly from one side to the other
+        assert np.all(fold == 0)
+        assert np.allclose(np.sort(across), np.linspace(0.0, 1.0, segments + 2))
+
+def test_foldTablePropsRoundTrip():
+    folds = foldKernel.FoldTable(2)
+    left = folds.append([0.0, 0.5, 0.0], [-1.0, 0.0, 0.0], foldKernel.SIDE_LEFT, 'Fold 001 LEFT Bone')
+    folds.append([0.0, 0.5, 0.0], [-1.0, 0.0, 0.0], foldKernel.SIDE_RIGHT, 'Fold 001 RIGHT Bone', left, 1)
+    child = folds.append([0.2, 0.0, 0.0], [0.0, 1.0, 0.0], foldKernel.SIDE_LEFT, 'Fläp, "2"', -1, None,
+        foldKernel.RIG_LOCKED)
+    folds.setParent(child, left)
+    props = folds.toProps()
+
+    # ID properties hold strings, numbers and number lists only
+    for value in props.values():
+        assert isinstance(value, str) or all(isinstance(item, (int, float)) for item in value)
+
+    loaded = foldKernel.FoldTable.fromProps(props)
+    assert loaded.boneNames == folds.boneNames
+    assert np.array_equal(loaded.numbers[:3], folds.numbers[:3])
+    assert np.array_equal(loaded.sides[:3], folds.sides[:3])
+    assert np.array_equal(loaded.parents[:3], [-1, -1, left])
+    assert np.array_equal(loaded.links[:3], [-1, left, -1])
+    assert np.array_equal(loaded.modes[:3], folds.modes[:3])
+    assert np.allclose(loaded.planePoints[:3], folds.planePoints[:3])
+    assert np.allclose(loaded.normals[:3], folds.normals[:3])
+    assert loaded.find('Fläp, "2"') == child
+    assert len(foldKernel.FoldTable.fromProps(foldKernel.FoldTable().toProps())) == 0
+
+def test_planarFacesSkipDanglingCreases():
+    # Unit square split by a diagonal, with a crease from the middle of the bottom side ending inside the sheet
+    coords = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0], [0.5, 0.0], [0.5, 0.2], [0.5, 0.35]])
+    edges = np.array([[0, 4], [4, 1], [1, 2], [2, 3], [3, 0], [0, 2], [4, 5], [5, 6]])
+    loopVerts, sizes = foldKernel.planarFaces(coords, edges)
+    faces = [face.tolist() for face in np.split(loopVerts, np.cumsum(sizes)[:-1])]
+
+    # Two faces, no vertex repeated and the spur verts in neither
+    assert len(faces) == 2
+    assert all(len(set(face)) == len(face) for face in faces)
+    assert sorted(sorted(face) for face in faces) == [[0, 1, 2, 4], [0, 2, 3]]
+
+def test_classifySplitsAtThePlane():
+    coords = np.array([[-1.0, 0.0, 0.0], [0.0, 0.5, 0.0], [1.0, 0.0, 0.0], [0.00001, 0.0, 0.0]])
+    planer, left, right = foldKernel.classify(coords, np.zeros(3), np.array([-1.0, 0.0, 0.0]))
+    assert planer.tolist() == [1, 3]
+    assert left.tolist() == [0]
+    assert right.tolist() == [2]
+
+def test_walkEdgeChainFindsTheEnds():
+    start, end, chainVerts = foldKernel.walkEdgeChain(np.array([[5, 2], [2, 9], [9, 4]]))
+    assert sorted([int(start), int(end)]) == [4, 5]
+    assert sorted(chainVerts.tolist()) == [2, 4, 5, 9]
+
+@pytest.mark.parametrize('edges', [[[0, 1], [1, 2], [1, 3]], [[0, 1], [1, 2], [2, 0]], [[0, 1], [2, 3]]])
+def test_walkEdgeChainRejectsOtherShapes(edges):
+    # A fork, a closed loop and two separate pieces
+    with pytest.raises(foldKernel.FoldSelectionError):
+        foldKernel.walkEdgeChain(np.array(edges))
+
+def test_checkCollinear():
+    coords = np.array([[0.0, 0.0, 0.0], [0.5, 0.0, 0.0], [1.0, 0.0, 0.0], [0.5, 0.1, 0.0]])
+    foldKernel.checkCollinear(coords, np.array([0, 1, 2]), 0, 2)
+    with pytest.raises(foldKernel.FoldSelectionError):
+        foldKernel.checkCollinear(coords, np.array([0, 3, 2]), 0, 2)
+
+def test_labelRegions():
+    labels = foldKernel.labelRegions(6, np.array([[4, 1], [1, 0], [3, 5]]))
+    assert labels.tolist() == [0, 0, 1, 2, 0, 2]
+
+def gridFaces(n):
+    # Quads of an n x n grid with their edge indices, in the layout of mesh loops
+    vid = lambda i, j: i * (n + 1) + j
+    faces = [[vid(i, j), vid(i, j + 1), vid(i + 1, j + 1), vid(i + 1, j)] for i in range(n) for j in range(n)]
+    edgeKey = {}
+    loopEdges = []
+    for face in faces:
+        for k in range(4):
+            loopEdges.append(edgeKey.setdefault(tuple(sorted((face[k], face[(k + 1) % 4]))), len(edgeKey)))
+    return np.array(faces).ravel(), np.full(len(faces), 4), np.array(loopEdges), edgeKey, (n + 1) ** 2
+
+def sameRegions(a, b):
+    # Equal partitions of the faces, whatever the region numbering
+    pairs = set(zip(a['faceRegion'].tolist(), b['faceRegion'].tolist()))
+    return len(pairs) == len(set(a['faceRegion'].tolist())) == len(set(b['faceRegion'].tolist()))
+
+def test_splitRegionsMatchesAFullRebuild():
+    n = 4
+    loopVerts, loopTotal, loopEdges, edgeKey, vertCount = gridFaces(n)
+    seams = np.zeros(len(edgeKey), dtype=bool)
+    regions = foldKernel.faceRegions(loopVerts, loopTotal, loopEdges, len(edgeKey), vertCount, seams)
+
+    # A full crease across the middle row, then half a crease down one column
+    for crease in ([(2 * (n + 1) + j, 2 * (n + 1) + j + 1) for j in range(n)],
+            [(i * (n + 1) + 1, (i + 1) * (n + 1) + 1) for i in range(2)]):
+        added = np.array([edgeKey[edge] for edge in crease])
+        seams = seams.copy()
+        seams[added] = True
+        regions = foldKernel.splitRegions(regions, seams, added, vertCount)
+        full = foldKernel.faceRegions(loopVerts, loopTotal, loopEdges, len(edgeKey), vertCount, seams)
+        assert sameRegions(regions, full)
+    assert regions['faceRegion'].max() + 1 == 3
+
+def test_containmentParentsNestsFolds():
+    # Fold 0 holds fold 1, fold 2 is apart from both, fold 3 crosses fold 0
+    bits = np.zeros((4, 16), dtype=bool)
+    bits[0, 0:8] = True
+    bits[1, 2:4] = True
+    bits[2, 10:12] = True
+    bits[3, 6:10] = True
+    parents, conflicts, order = foldKernel.containmentParents(np.packbits(bits, axis=1))
+    assert parents.tolist() == [-1, 0, -1, -1]
+    assert conflicts.tolist() == [[0, 3]]
+    assert order.tolist().index(1) < order.tolist().index(0)
+
+def crossCoords(angles):
+    # A crease vertex at the origin with one crease out to the unit circle per angle
+    coords = np.array([[0.0, 0.0]] + [[np.cos(a), np.sin(a)] for a in angles])
+    edges = np.array([[0, i + 1] for i in range(len(angles))])
+    interior = np.zeros(len(coords), dtype=bool)
+    interior[0] = True
+    return coords, edges, interior
+
+def test_flatFoldCheck():
+    coords, edges, interior = crossCoords(np.radians([0.0, 90.0, 180.0, 270.0]))
+    mountain = np.array([True, True, True, False])
+    verts, flags, kawasaki, mountains, valleys = foldKernel.flatFoldCheck(coords, edges, mountain, ~mountain, interior)
+    assert verts.tolist() == [0] and flags.tolist() == [0]
+    assert (mountains.tolist(), valleys.tolist()) == ([3], [1])
+
+    # Two and two breaks Maekawa, uneven sectors break Kawasaki
+    mountain = np.array([True, False, True, False])
+    flags = foldKernel.flatFoldCheck(coords, edges, mountain, ~mountain, interior)[1]
+    assert flags.tolist() == [foldKernel.FLAT_MAEKAWA]
+    coords, edges, interior = crossCoords(np.radians([0.0, 80.0, 180.0, 270.0]))
+    mountain = np.array([True, True, True, False])
+    verts, flags, kawasaki = foldKernel.flatFoldCheck(coords, edges, mountain, ~mountain, interior)[:3]
+    assert flags.tolist() == [foldKernel.FLAT_KAWASAKI]
+    assert np.isclose(abs(kawasaki[0]), np.radians(20.0))  # alternating sector sum 80 - 100 + 90 - 90
+
+    # Three creases can never fold flat
+    coords, edges, interior = crossCoords(np.radians([0.0, 120.0, 240.0]))
+    flags = foldKernel.flatFoldCheck(coords, edges, np.ones(3, dtype=bool), np.zeros(3, dtype=bool), interior)[1]
+    assert flags.tolist()[0] & foldKernel.FLAT_ODD_DEGREE
+
+def test_foldTableRejectsParentCycles():
+    folds = foldKernel.FoldTable()
+    a = folds.append(np.zeros(3), np.ones(3), foldKernel.SIDE_LEFT, 'A')
+    b = folds.append(np.zeros(3), np.ones(3), foldKernel.SIDE_LEFT, 'B')
+    c = folds.append(np.zeros(3), np.ones(3), foldKernel.SIDE_LEFT, 'C')
+    folds.setParent(b, a)
+    folds.setParent(c, b)
+    with pytest.raises(ValueError):
+        folds.setParent(a, c)
+    assert folds.roots().tolist() == [a]
+
+    # Moving a fold to another parent updates both child lists
+    folds.setParent(c, a)
+    assert folds.children[b] == [] and sorted(folds.children[a]) == [b, c]
+
+def test_foldTableTopologicalOrder():
+    folds = foldKernel.FoldTable()
+    child = folds.append(np.zeros(3), np.ones(3), foldKernel.SIDE_LEFT, 'Child')
+    parent = folds.append(np.zeros(3), np.ones(3), foldKernel.SIDE_LEFT, 'Parent')
+    linked = folds.append(np.zeros(3), np.ones(3), foldKernel.SIDE_RIGHT, 'Linked', child)
+    folds.setParent(child, parent)
+    order = folds.topologicalOrder().tolist()
+    assert order.index(parent) < order.index(child) < order.index(linked)
+
+    # A link back up the tree is a cycle
+    folds.setLink(parent, linked)
+    with pytest.raises(ValueError):
+        folds.topologicalOrder()
+
+def test_jsonStreamAcrossChunks():
+    # Tiny chunks make every token, number and string straddle a buffer refill
+    text = '{"skip": {"a": [1, {"b": null}], "c": "}]"}, "numbers": [12.5, -3e2, 7], "names": ["x, y", "z"]}'
+    stream = foldFormat._JsonStream(io.StringIO(text), chunkSize=3)
+    found = {}
+    for key in stream.members():
+        if key == 'skip':
+            stream.skip()
+        else:
+            found[key] = [stream.value() for _ in stream.items()]
+    assert found == {'numbers': [12.5, -300.0, 7], 'names': ['x, y', 'z']}
+
+def test_jsonStreamRejectsBadSeparators():
+    stream = foldFormat._JsonStream(io.StringIO('[1 2]'), chunkSize=2)
+    with pytest.raises(foldFormat.FoldFormatError):
+        for _ in stream.items():
+            stream.value()